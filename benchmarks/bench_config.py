@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+'''
+Benchmark bulk CONFIG parsing and writing against the per-atom reader and writer
+
+Run from anywhere as python benchmarks/bench_config.py [CONFIG]
+'''
+
+import argparse
+import os.path
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from dlpoly.config import Atom, Config  # noqa: E402
+
+
+def read_atom(atom, fileHandle, level):
+    ''' Original Atom.read, kept here as Atom.read has since changed '''
+    line = fileHandle.readline()
+    if not line:
+        return False
+    element, index = line.split()
+    atom.element = element
+    atom.index = int(index)
+    atom.pos = [float(i) for i in fileHandle.readline().split()]
+    if level > 0:
+        atom.vel = [float(i) for i in fileHandle.readline().split()]
+        if level > 1:
+            atom.forces = [float(i) for i in fileHandle.readline().split()]
+    return atom
+
+
+def read_per_atom(filename):
+    ''' Original parser: one Atom read per record '''
+    with open(filename, 'r') as fileIn:
+        fileIn.readline()
+        level, pbc, *_ = map(int, fileIn.readline().split())
+        if pbc > 0:
+            for _ in range(3):
+                fileIn.readline()
+        atoms = []
+        while True:
+            atom = read_atom(Atom(), fileIn, level)
+            if not atom:
+                break
+            atoms.append(atom)
+    return atoms
+
+
+def read_bulk(filename):
+    ''' Vectorised parser '''
+    return Config(filename)
+
+
+def write_per_atom(config, filename):
+    ''' Original writer: one formatted print per atom '''
+    with open(filename, 'w') as outFile:
+        for atom in config.atoms:
+            print(Atom.write(atom, config.level), file=outFile)
+
+
+def write_bulk(config, filename):
+    ''' Chunked vectorised writer '''
+    config.write(filename, level=config.level)
+
+
+def main():
+    ''' Time both parsers on the given file '''
+    parser = argparse.ArgumentParser(description='Benchmark CONFIG parsers')
+    parser.add_argument('config', nargs='?', default=os.path.join(ROOT, 'tests', 'CONFIG'),
+                        help='CONFIG file to read')
+    parser.add_argument('-n', '--repeats', type=int, default=3, help='Number of timed repeats')
+    parser.add_argument('-o', '--output', help='Scratch file for write benchmark (default a temporary file)')
+    args = parser.parse_args()
+
+    for name, func in (('per-atom', read_per_atom), ('bulk', read_bulk)):
+        best = min(timeit.repeat(lambda: func(args.config), number=1, repeat=args.repeats))
+        print('read  {:10s} {:10.4f} s'.format(name, best))
+
+    config = Config(args.config)
+    with tempfile.TemporaryDirectory() as tmpDir:
+        output = args.output or os.path.join(tmpDir, 'bench.config')
+        for name, func in (('per-atom', write_per_atom), ('bulk', write_bulk)):
+            best = min(timeit.repeat(lambda: func(config, output), number=1, repeat=args.repeats))
+            print('write {:10s} {:10.4f} s'.format(name, best))
+
+
+if __name__ == '__main__':
+    main()
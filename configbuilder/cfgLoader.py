@@ -49,10 +49,8 @@ class CFG(Molecule):
 
     def _centre_com(self):
         ''' Centre CoM about 0, 0, 0 '''
-        centreOfMass = 0.
-        for atom in self.atoms:
-            centreOfMass += self.species[atom.element].mass * atom.pos
-        centreOfMass /= np.sum(spec.mass for spec in self.atomSpecies)
+        masses = np.asarray([spec.mass for spec in self.atomSpecies])
+        centreOfMass = masses @ np.asarray(self.atomPos, dtype=float) / masses.sum()
         self.translate(-centreOfMass)
 
     def _centre_mol(self):
@@ -9,9 +9,9 @@ import numpy as np
 if sys.version_info[0] == 2:
     raise ImportError('dlpoly-py requires Python3. This is Python2.')
 
-if LooseVersion(np.__version__) < '1.5':
+if LooseVersion(np.__version__) < '1.17':
     raise ImportError(
-        'dlpoly-py needs NumPy-1.5.0 or later. You have: {:s}'.format(np.__version__))
+        'dlpoly-py needs NumPy-1.17.0 or later. You have: {:s}'.format(np.__version__))
 
 
 # from https://stackoverflow.com/questions/1057431
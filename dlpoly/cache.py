@@ -0,0 +1,118 @@
+'''
+Module providing a binary sidecar cache for parsed DLPOLY files
+'''
+
+import hashlib
+import os
+import os.path
+import pickle
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'dlpoly-py')
+
+
+class FileCache():
+    ''' Size-bounded cache of parsed DLPOLY objects keyed on source path, size, mtime and content hash
+
+    Entries are pickles of the parsed object (Config arrays, Field graph, Statis data) stored in cacheDir.
+    Changing the source invalidates its entry; once the cache exceeds maxSize bytes the least
+    recently used entries are evicted.
+    '''
+    _sampleSize = 1 << 20
+
+    def __init__(self, cacheDir=None, maxSize=2 << 30, fullHash=False):
+        if cacheDir is None:
+            cacheDir = os.environ.get('DLPOLY_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.cacheDir = cacheDir
+        self.maxSize = maxSize
+        # Hash whole file rather than sampled blocks
+        self.fullHash = fullHash
+        os.makedirs(self.cacheDir, exist_ok=True)
+
+    def _entry(self, cls, source):
+        ''' Cache file for a given class and source '''
+        name = hashlib.sha1('{}:{}'.format(cls.__name__, os.path.abspath(source)).encode()).hexdigest()
+        return os.path.join(self.cacheDir, name + '.pkl')
+
+    def content_hash(self, source):
+        ''' Hash of file contents; sampled start, middle and end blocks unless fullHash '''
+        digest = hashlib.blake2b()
+        size = os.path.getsize(source)
+        with open(source, 'rb') as fileIn:
+            if self.fullHash or size <= 3*self._sampleSize:
+                for block in iter(lambda: fileIn.read(self._sampleSize), b''):
+                    digest.update(block)
+            else:
+                for start in (0, (size - self._sampleSize)//2, size - self._sampleSize):
+                    fileIn.seek(start)
+                    digest.update(fileIn.read(self._sampleSize))
+        return digest.hexdigest()
+
+    def key(self, source):
+        ''' Key identifying the current state of source '''
+        stat = os.stat(source)
+        return (os.path.abspath(source), stat.st_size, stat.st_mtime_ns, self.content_hash(source))
+
+    def load(self, cls, source, **kwargs):
+        ''' Return cls(source, **kwargs), from the cache if the source is unchanged '''
+        entry = self._entry(cls, source)
+        key = self.key(source)
+        try:
+            with open(entry, 'rb') as cacheFile:
+                cachedKey, obj = pickle.load(cacheFile)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            cachedKey, obj = None, None
+
+        if cachedKey == key:
+            os.utime(entry)  # Mark as recently used
+            return obj
+
+        obj = cls(source, **kwargs)
+        if hasattr(obj, 'load'):  # Do not store deferred objects
+            obj.load()
+        self.store(entry, key, obj)
+        return obj
+
+    def store(self, entry, key, obj):
+        ''' Write obj to the cache and evict old entries '''
+        tmpEntry = '{}.{}.tmp'.format(entry, os.getpid())
+        try:
+            with open(tmpEntry, 'wb') as cacheFile:
+                pickle.dump((key, obj), cacheFile, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpEntry, entry)
+        except BaseException:
+            # Partial entries are not seen by evict, so must not be left behind
+            try:
+                os.remove(tmpEntry)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self):
+        ''' Remove least recently used entries until the cache fits in maxSize '''
+        entries = []
+        for name in os.listdir(self.cacheDir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cacheDir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        ''' Remove all entries '''
+        self.maxSize, maxSize = 0, self.maxSize
+        self.evict()
+        self.maxSize = maxSize
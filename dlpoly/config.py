@@ -2,19 +2,85 @@
 Module to handle DLPOLY config files
 '''
 
-import copy
+from collections.abc import Sequence
+import itertools
+import mmap
 import numpy as np
 # from dlpoly.species import Species
-from dlpoly.utility import DLPData
+from dlpoly.utility import DLPData, LazyLoader, open_file, compression_of, COMPRESSION
+from dlpoly.neighbours import neighbour_pairs
+
+
+def read_atom_block(lines, level):
+    ''' Parse a block of atom records (level+2 lines each) into arrays in bulk
+
+    Returns: elements, indices, positions, velocities, forces, extra
+    where extra holds any header columns after the index as strings (e.g. HISTORY mass, charge)
+    '''
+    nLines = level + 2
+    if len(lines) % nLines:
+        raise RuntimeError('Error reading atoms: {} lines is not a whole number of '
+                           'level {} records'.format(len(lines), level))
+    nAtoms = len(lines) // nLines
+    if not nAtoms:
+        return (np.zeros(0, dtype='U8'), np.zeros(0, dtype=int),
+                np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 0), dtype='U8'))
+
+    header = ' '.join(lines[0::nLines]).split()
+    if len(header) % nAtoms == 0:
+        nCols = len(header) // nAtoms
+    else:  # Ragged headers, keep element and index
+        header = [token for line in lines[0::nLines] for token in line.split()[:2]]
+        nCols = 2
+    elements = np.asarray(header[0::nCols], dtype=str)
+    if nCols > 1:
+        indices = np.fromstring(' '.join(header[1::nCols]), dtype=int, sep=' ')
+    else:
+        indices = np.arange(1, nAtoms+1)
+    extra = np.asarray([header[i::nCols] for i in range(2, nCols)], dtype=str).reshape(nCols-2, nAtoms).T
+
+    vectors = []
+    for i in range(1, nLines):
+        vector = np.fromstring(' '.join(lines[i::nLines]), sep=' ')
+        if vector.size != 3*nAtoms:
+            raise RuntimeError('Error reading atoms: malformed line in record type {}'.format(i))
+        vectors.append(vector.reshape(nAtoms, 3))
+    vectors += [np.zeros((nAtoms, 3)) for _ in range(len(vectors), 3)]
+
+    return (elements, indices, *vectors, extra)
+
+
+def write_atom_block(outFile, elements, indices, vectors, level, chunkSize=16384, extra=()):
+    ''' Write atom records in fixed-width format, formatting chunkSize atoms per buffered write
+
+    vectors: sequence of (N, 3) arrays (positions, velocities, forces) of which the first level+1 are written
+    extra: sequence of (N,) arrays written after the index on the header line (e.g. HISTORY mass, charge)
+    '''
+    nVec = level + 1
+    nHead = 2 + len(extra)
+    template = '%-8s%10d' + '%12.6f'*len(extra) + '\n' + '%20.10f%20.10f%20.10f\n'*nVec
+    for start in range(0, len(indices), chunkSize):
+        end = min(start + chunkSize, len(indices))
+        block = np.empty((end - start, nHead + 3*nVec), dtype=object)
+        block[:, 0] = elements[start:end]
+        block[:, 1] = indices[start:end]
+        for i, column in enumerate(extra):
+            block[:, 2+i] = column[start:end]
+        for i in range(nVec):
+            block[:, nHead+3*i:nHead+3+3*i] = vectors[i][start:end]
+        outFile.write((template * (end - start)) % tuple(block.ravel().tolist()))
 
 
 class Atom(DLPData):
     ''' Class defining a DLPOLY atom type '''
+    # Shared between instances so converters are looked up without rehashing
+    _schema = {'element': str, 'pos': (float, float, float),
+               'vel': (float, float, float),
+               'forces': (float, float, float), 'index': int,
+               'molecule': (str, int)}
+
     def __init__(self, element='', pos=None, vel=None, forces=None, index=1):
-        DLPData.__init__(self, {'element': str, 'pos': (float, float, float),
-                                'vel': (float, float, float),
-                                'forces': (float, float, float), 'index': int,
-                                'molecule': (str, int)})
+        DLPData.__init__(self, Atom._schema)
         self.element = element
         self.pos = np.zeros(3) if pos is None else pos
         self.vel = np.zeros(3) if vel is None else vel
@@ -59,71 +125,241 @@ class Atom(DLPData):
         if not line:
             return False
         element, index = line.split()
-        self.element = element
-        self.index = int(index)
-        self.pos = [float(i) for i in fileHandle.readline().split()]
+        # Types are guaranteed here so skip conversion
+        self.set_trusted(element=element, index=int(index),
+                         pos=[float(i) for i in fileHandle.readline().split()])
         if level > 0:
-            self.vel = [float(i) for i in fileHandle.readline().split()]
+            self.set_trusted(vel=[float(i) for i in fileHandle.readline().split()])
             if level > 1:
-                self.forces = [float(i) for i in fileHandle.readline().split()]
+                self.set_trusted(forces=[float(i) for i in fileHandle.readline().split()])
         return self
 
 
-class Config():
+class AtomView():
+    ''' Lightweight view of a single atom stored in a Config's arrays '''
+    __slots__ = ('_config', '_ind')
+
+    def __init__(self, config, ind):
+        self._config = config
+        self._ind = ind
+
+    @property
+    def element(self):
+        ''' Element name of viewed atom '''
+        return str(self._config.elements[self._ind])
+
+    @element.setter
+    def element(self, element):
+        elements = self._config.elements
+        if len(element) > elements.dtype.itemsize // np.dtype('U1').itemsize:
+            self._config.elements = elements.astype('U{}'.format(len(element)))
+        self._config.elements[self._ind] = element
+
+    @property
+    def index(self):
+        ''' Index of viewed atom '''
+        return int(self._config.indices[self._ind])
+
+    @index.setter
+    def index(self, index):
+        self._config.indices[self._ind] = index
+
+    @property
+    def pos(self):
+        ''' Position of viewed atom (view into config.positions) '''
+        return self._config.positions[self._ind]
+
+    @pos.setter
+    def pos(self, pos):
+        self._config.positions[self._ind] = pos
+
+    @property
+    def vel(self):
+        ''' Velocity of viewed atom (view into config.velocities) '''
+        return self._config.velocities[self._ind]
+
+    @vel.setter
+    def vel(self, vel):
+        self._config.velocities[self._ind] = vel
+
+    @property
+    def forces(self):
+        ''' Forces on viewed atom (view into config.forces) '''
+        return self._config.forces[self._ind]
+
+    @forces.setter
+    def forces(self, forces):
+        self._config.forces[self._ind] = forces
+
+    @property
+    def molecule(self):
+        ''' Molecule (name, number) the viewed atom belongs to, if known '''
+        if self._config.molecule is None:
+            return None
+        return self._config.molecule[self._ind]
+
+    @molecule.setter
+    def molecule(self, molecule):
+        if self._config.molecule is None:
+            self._config.molecule = [None]*self._config.natoms
+        self._config.molecule[self._ind] = molecule
+
+    write = Atom.write
+    __str__ = Atom.__str__
+
+
+class AtomList(Sequence):
+    ''' Sequence of AtomViews over a Config '''
+    def __init__(self, config):
+        self._config = config
+
+    def __len__(self):
+        return self._config.natoms
+
+    def __getitem__(self, ind):
+        if isinstance(ind, slice):
+            return [AtomView(self._config, i) for i in range(*ind.indices(len(self)))]
+        if ind < 0:
+            ind += len(self)
+        if not 0 <= ind < len(self):
+            raise IndexError('Atom index {} out of range'.format(ind))
+        return AtomView(self._config, ind)
+
+
+class Config(LazyLoader):
     ''' Class defining a DLPOLY config file '''
-    params = {'atoms': list, 'cell': np.ndarray, 'pbc': int,
+    params = {'elements': np.ndarray, 'indices': np.ndarray, 'positions': np.ndarray,
+              'velocities': np.ndarray, 'forces': np.ndarray, 'cell': np.ndarray, 'pbc': int,
               'natoms': int, 'level': int, 'title': str}
+    _deferred = ('elements', 'indices', 'positions', 'velocities', 'forces', 'molecule')
 
-    natoms = property(lambda self: len(self.atoms))
-
-    def __init__(self, source=None):
+    def __init__(self, source=None, lazy=False):
         self.title = ''
         self.level = 0
-        self.atoms = []
         self.pbc = 0
         self.cell = np.zeros((3, 3))
+        self.molecule = None
+        self.resize(0)
+        self._headerAtoms = None
+        self._fileLayout = None
 
         if source is not None:
             self.source = source
-            self.read(source)
+            if lazy:
+                self.read_header(source)
+                self.defer(source)
+            else:
+                self.read(source)
+
+    @property
+    def natoms(self):
+        ''' Number of atoms, taken from the header until the atoms are loaded '''
+        if not self.loaded and self._headerAtoms is not None:
+            return self._headerAtoms
+        return len(self.positions)
+
+    @property
+    def atoms(self):
+        ''' Per-atom views onto the config arrays '''
+        return AtomList(self)
+
+    @atoms.setter
+    def atoms(self, atoms):
+        # Copy out first as atoms may be views onto self
+        newAtoms = Config()
+        newAtoms.add_atoms(list(atoms))
+        self.resize(0)
+        self.add_atoms(newAtoms)
+
+    def resize(self, natoms):
+        ''' Allocate fresh (zeroed) per-atom arrays for natoms atoms '''
+        self.elements = np.full(natoms, '', dtype='U8')
+        self.indices = np.arange(1, natoms+1)
+        self.positions = np.zeros((natoms, 3))
+        self.velocities = np.zeros((natoms, 3))
+        self.forces = np.zeros((natoms, 3))
+        self.molecule = None
+
+    @staticmethod
+    def open_indexed(filename='CONFIG', validate=True):
+        ''' Open a config for random access to its atoms without reading the whole file '''
+        return IndexedConfig(filename, validate)
+
+    @staticmethod
+    def iter_chunks(filename='CONFIG', chunkAtoms=65536):
+        ''' Yield successive Configs of at most chunkAtoms atoms without reading the whole file
 
-    def write(self, filename='new.config', title=None, level=0):
+        Each chunk carries the file's title, level, pbc and cell, so can be passed on to a ConfigWriter
+        '''
+        header = Config()
+        with open_file(filename, 'r') as fileIn:
+            header._read_header(fileIn)
+            nLines = chunkAtoms * (header.level + 2)
+            while True:
+                lines = list(itertools.islice(fileIn, nLines))
+                while lines and not lines[-1].strip():
+                    lines.pop()
+                if not lines:
+                    break
+                chunk = Config()
+                chunk.title, chunk.level, chunk.pbc, chunk.cell = header.title, header.level, header.pbc, header.cell
+                (chunk.elements, chunk.indices,
+                 chunk.positions, chunk.velocities, chunk.forces, _) = read_atom_block(lines, header.level)
+                yield chunk
+
+    def write(self, filename='new.config', title=None, level=0, compression=None):
+        ''' Write config to file, compressed if filename ends .gz, .bz2, .xz or compression is given '''
         self.level = level
-        with open(filename, 'w') as outFile:
-            outFile.write('{0:72s}\n'.format(self.title if title is None else title))
-            outFile.write('{0:10d}{1:10d}{2:10d}\n'.format(level,
-                                                           self.pbc,
-                                                           self.natoms))
-            if self.pbc > 0:
-                for j in range(3):
-                    outFile.write('{0:20.10f}{1:20.10f}{2:20.10f}\n'.format(
-                        self.cell[j, 0], self.cell[j, 1], self.cell[j, 2]))
-            for atom in self.atoms:
-                print(atom.write(self.level), file=outFile)
+        with ConfigWriter(filename, self.title if title is None else title, level,
+                          self.pbc, self.cell, self.natoms, compression=compression) as writer:
+            writer.write(self)
+
+    def neighbour_pairs(self, cutoff, vectors=False):
+        ''' Unique pairs of atoms closer than cutoff as arrays i, j, distance (see neighbours.CellList) '''
+        return neighbour_pairs(self, cutoff, vectors)
+
+    def make_whole(self, topology):
+        ''' Rejoin molecules broken across periodic boundaries (see topology.Topology) '''
+        self.positions = topology.make_whole(self.positions, self.cell, self.pbc)
 
     def add_atoms(self, other):
         ''' Add two Configs together to make one bigger config '''
         lastIndex = self.natoms
         if isinstance(other, Config):
-            self.atoms += [copy.copy(atom) for atom in other.atoms]
+            elements, indices = other.elements, other.indices
+            positions, velocities, forces = other.positions, other.velocities, other.forces
+            molecule = other.molecule
         elif isinstance(other, (list, tuple)):
-            self.atoms += [copy.copy(atom) for atom in other]
-        # Shift new atoms' indices to reflect place in new config
-        for i in range(lastIndex, self.natoms):
-            self.atoms[i].index += lastIndex
+            elements = np.asarray([atom.element for atom in other], dtype=str)
+            indices = np.asarray([atom.index for atom in other], dtype=int)
+            positions, velocities, forces = (np.asarray([getattr(atom, key) for atom in other],
+                                                        dtype=float).reshape(-1, 3)
+                                             for key in ('pos', 'vel', 'forces'))
+            molecule = [getattr(atom, 'molecule', None) for atom in other]
+            if all(mol is None for mol in molecule):
+                molecule = None
+        else:
+            raise TypeError('Cannot add {} to Config'.format(type(other).__name__))
 
-    def read(self, filename='CONFIG'):
-        ''' Read file into Config '''
-        try:
-            fileIn = open(filename, 'r')
-        except IOError:
-            print('File {0:s} does not exist!'.format(filename))
-            return []
+        if self.molecule is not None or molecule is not None:
+            self.molecule = ((self.molecule if self.molecule is not None else [None]*lastIndex) +
+                             (list(molecule) if molecule is not None else [None]*len(indices)))
+
+        self.elements = np.concatenate((self.elements, elements))
+        # Shift new atoms' indices to reflect place in new config
+        self.indices = np.concatenate((self.indices, indices + lastIndex))
+        self.positions = np.concatenate((self.positions, positions))
+        self.velocities = np.concatenate((self.velocities, velocities))
+        self.forces = np.concatenate((self.forces, forces))
 
+    def _read_header(self, fileIn):
+        ''' Read title, level, pbc, cell and any stated number of atoms from open file '''
         self.title = fileIn.readline().strip()
         line = fileIn.readline().split()
         self.level = int(line[0])
         self.pbc = int(line[1])
+        self._headerAtoms = int(line[2]) if len(line) > 2 else None
+        self._fileLayout = (self.level, self.pbc)
         if self.pbc > 0:
             for j in range(3):
                 line = fileIn.readline().split()
@@ -133,16 +369,248 @@ class Config():
                     except ValueError:
                         raise RuntimeError('Error reading cell')
 
-        self.atoms = []
-        while True:
-            atom = Atom().read(fileIn, self.level)
-            if not atom:
-                break
-            self.atoms.append(atom)
+    def read_header(self, filename='CONFIG'):
+        ''' Read only the header of a config file, leaving atoms untouched '''
+        with open_file(filename, 'r') as fileIn:
+            self._read_header(fileIn)
+            if self._headerAtoms is None and compression_of(filename):  # Cannot index, count records
+                self._headerAtoms = sum(1 for line in fileIn if line.strip()) // (self.level + 2)
+        if self._headerAtoms is None:
+            with IndexedConfig(filename) as indexed:
+                self._headerAtoms = indexed.natoms
+        return self
+
+    def read(self, filename='CONFIG'):
+        ''' Read file into Config '''
+        try:
+            fileIn = open_file(filename, 'r')
+        except IOError:
+            print('File {0:s} does not exist!'.format(filename))
+            return []
+
+        with fileIn:
+            self._read_header(fileIn)
+            self._read_atoms(fileIn, self.level)
+        return self
+
+    def _read_deferred(self, filename):
+        ''' Read only the atoms of a lazy config, keeping any header fields set since construction '''
+        level, pbc = self._fileLayout
+        with open_file(filename, 'r') as fileIn:
+            for _ in range(2 + (3 if pbc > 0 else 0)):
+                fileIn.readline()
+            self._read_atoms(fileIn, level)
+
+    def _read_atoms(self, fileIn, level):
+        ''' Read the atom records of level from the rest of an open file '''
+        lines = fileIn.read().splitlines()
+        while lines and not lines[-1].strip():
+            lines.pop()
+
+        self.resize(0)
+        (self.elements, self.indices,
+         self.positions, self.velocities, self.forces, _) = read_atom_block(lines, level)
+
+
+class ConfigWriter():
+    ''' Write a CONFIG file incrementally from chunks of atoms
+
+    If natoms is not known up front the header count is patched when the writer is closed
+    (or omitted for compressed output, which cannot be rewound).
+    With renumber, atoms are given consecutive indices in the order written.
+    '''
+    def __init__(self, filename='new.config', title='', level=0, pbc=0, cell=None, natoms=None, renumber=False,
+                 compression=None):
+        self.level = level
+        self.renumber = renumber
+        self.natoms = natoms
+        self.written = 0
+        self._outFile = open_file(filename, 'w', compression)
+        self._outFile.write('{0:72s}\n'.format(title))
+        self._outFile.write('{0:10d}{1:10d}'.format(level, pbc))
+        # Compressed streams may claim to be seekable but cannot be rewound for writing
+        rewindable = (COMPRESSION[compression] if compression else compression_of(filename, 'w')) is None
+        self._countPos = self._outFile.tell() if rewindable else None
+        if natoms is not None:
+            self._outFile.write('{0:10d}'.format(natoms))
+        elif self._countPos is not None:
+            self._outFile.write('{0:10d}'.format(0))
+        self._outFile.write('\n')
+        if pbc > 0:
+            for j in range(3):
+                self._outFile.write('{0:20.10f}{1:20.10f}{2:20.10f}\n'.format(
+                    cell[j, 0], cell[j, 1], cell[j, 2]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, config):
+        ''' Append the atoms of config (e.g. a chunk from Config.iter_chunks) '''
+        indices = (np.arange(self.written+1, self.written+config.natoms+1) if self.renumber
+                   else config.indices)
+        write_atom_block(self._outFile, config.elements, indices,
+                         (config.positions, config.velocities, config.forces), self.level)
+        self.written += config.natoms
+
+    def close(self):
+        ''' Finish file, filling in the number of atoms if it was not given '''
+        if self._outFile.closed:
+            return
+        try:
+            if self.natoms is None and self._countPos is not None:
+                self._outFile.seek(self._countPos)
+                self._outFile.write('{0:10d}'.format(self.written))
+        finally:
+            self._outFile.close()
+
 
-        fileIn.close()
+class IndexedConfig():
+    ''' Memory-mapped CONFIG file giving random access to atoms by record offset
+
+    Records written by DL_POLY (and Config.write) are fixed width, so offsets are computed
+    arithmetically from the first record and spot-checked. Otherwise a single vectorised
+    newline scan builds the record offset table.
+    '''
+    _scanChunk = 1 << 26
+    _nChecks = 16
+
+    def __init__(self, source='CONFIG', validate=True):
+        if compression_of(source):
+            raise ValueError('Cannot index compressed file {}, decompress it or use Config.iter_chunks'.format(source))
+        self.source = source
+        self._file = open(source, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.title = self._readline().decode().strip()
+        line = self._readline().split()
+        self.level = int(line[0])
+        self.pbc = int(line[1])
+        self.cell = np.zeros((3, 3))
+        if self.pbc > 0:
+            for j in range(3):
+                try:
+                    self.cell[j, :] = [float(val) for val in self._readline().split()[:3]]
+                except ValueError:
+                    raise RuntimeError('Error reading cell')
+        self._bodyStart = self._map.tell()
+        self._recordLength = None
+        self._offsets = None
+
+        if not self._fixed_width(validate):
+            self._scan_offsets()
+
+    def __enter__(self):
         return self
 
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.natoms
+
+    def __getitem__(self, ind):
+        if isinstance(ind, slice):
+            return self.read_atoms(*ind.indices(self.natoms))
+        if ind < 0:
+            ind += self.natoms
+        if not 0 <= ind < self.natoms:
+            raise IndexError('Atom index {} out of range'.format(ind))
+        return self.read_atoms(ind, ind+1).atoms[0]
+
+    @property
+    def natoms(self):
+        ''' Number of atoms in file '''
+        if self._offsets is not None:
+            return len(self._offsets) - 1
+        return (len(self._map) - self._bodyStart) // self._recordLength
+
+    def offset(self, ind):
+        ''' Byte offset of the start of atom record ind '''
+        if self._offsets is not None:
+            return int(self._offsets[ind])
+        return self._bodyStart + ind*self._recordLength
+
+    def close(self):
+        ''' Release the file map '''
+        self._map.close()
+        self._file.close()
+
+    def read_atoms(self, start=0, stop=None, step=1):
+        ''' Read atoms start:stop:step into a new Config '''
+        stop = self.natoms if stop is None else stop
+        if step == 1:
+            lines = self._map[self.offset(start):self.offset(max(start, stop))].decode().splitlines()
+        else:
+            lines = [line for ind in range(start, stop, step)
+                     for line in self._map[self.offset(ind):self.offset(ind+1)].decode().splitlines()]
+
+        config = Config()
+        config.title, config.level, config.pbc, config.cell = self.title, self.level, self.pbc, self.cell.copy()
+        (config.elements, config.indices,
+         config.positions, config.velocities, config.forces, _) = read_atom_block(lines, self.level)
+        return config
+
+    def _readline(self):
+        line = self._map.readline()
+        if not line:
+            raise RuntimeError('Unexpected end of file in {}'.format(self.source))
+        return line
+
+    def _fixed_width(self, validate):
+        ''' Check whether all records share the length of the first '''
+        nLines = self.level + 2
+        bodySize = len(self._map) - self._bodyStart
+        end = self._bodyStart
+        for _ in range(nLines):
+            end = self._map.find(b'\n', end) + 1
+            if not end:
+                return False
+        self._recordLength = end - self._bodyStart
+        if bodySize % self._recordLength:
+            return False
+        if not validate:
+            return True
+
+        # Spot check that sampled records start on a header line and end on a newline
+        for ind in np.unique(np.linspace(0, self.natoms - 1, self._nChecks, dtype=int)):
+            start = self.offset(ind)
+            record = self._map[start:start + self._recordLength]
+            lines = record.split(b'\n')
+            if len(lines) != nLines + 1 or lines[-1] or len(lines[0].split()) == 3:
+                return False
+        return True
+
+    def _scan_offsets(self):
+        ''' Build record offset table by locating every (level+2)th newline '''
+        nLines = self.level + 2
+        size = len(self._map)
+        # Ignore trailing blank lines
+        end = size
+        while end > self._bodyStart and not self._map[end-1:end].strip():
+            end -= 1
+        if end < size:
+            end = self._map.find(b'\n', end) + 1 or size
+
+        offsets = [np.asarray([self._bodyStart])]
+        nSeen = 0
+        for pos in range(self._bodyStart, end, self._scanChunk):
+            chunk = np.frombuffer(self._map[pos:min(pos + self._scanChunk, end)], dtype=np.uint8)
+            newlines = np.flatnonzero(chunk == 10)
+            lineNo = nSeen + np.arange(1, len(newlines)+1)
+            offsets.append(newlines[lineNo % nLines == 0] + pos + 1)
+            nSeen += len(newlines)
+        if end and self._map[end-1:end] != b'\n':  # Unterminated final line
+            nSeen += 1
+            if nSeen % nLines == 0:
+                offsets.append(np.asarray([end]))
+
+        if nSeen % nLines:
+            raise RuntimeError('Error reading atoms: {} lines is not a whole number of '
+                               'level {} records'.format(nSeen, self.level))
+        self._offsets = np.concatenate(offsets)
+
 
 if __name__ == '__main__':
     CONFIG = Config().read()
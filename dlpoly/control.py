@@ -4,7 +4,7 @@ Module to handle DLPOLY control files
 '''
 
 import os.path
-from dlpoly.utility import DLPData
+from dlpoly.utility import DLPData, open_file
 
 
 class FField(DLPData):
@@ -341,7 +341,7 @@ class Control(DLPData):
 
     def read(self, filename):
         ''' Read a control file '''
-        with open(filename, 'r') as inFile:
+        with open_file(filename, 'r') as inFile:
             self['title'] = inFile.readline()
             for line in inFile:
                 line = line.strip()
@@ -366,7 +366,7 @@ class Control(DLPData):
 
     def write(self, filename='CONTROL'):
         ''' Write the control out to a file '''
-        with open(filename, 'w') as outFile:
+        with open_file(filename, 'w') as outFile:
             print(self.title, file=outFile)
             for key, val in self.__dict__.items():
                 if key in ('title', 'filename') or key.startswith('_'):
@@ -0,0 +1,40 @@
+'''
+Module providing FFT based time correlation functions
+'''
+
+import numpy as np
+
+
+def _fft_length(nTimes):
+    ''' Padded transform length avoiding circular wrap-around '''
+    length = 1
+    while length < 2*nTimes:
+        length <<= 1
+    return length
+
+
+def correlate(first, second=None, axis=0, average=True):
+    ''' Time correlation <a(t0) b(t0+t)> of series along axis by FFT, O(T log T) in the number of times
+
+    first, second: arrays of series (second defaults to first for an autocorrelation)
+    average: divide lag t by the number of time origins T - t, otherwise return the sum over origins
+    Returns: array of the shape of first with lags 0..T-1 along axis
+    '''
+    first = np.moveaxis(np.asarray(first, dtype=float), axis, 0)
+    nTimes = first.shape[0]
+    length = _fft_length(nTimes)
+    fFirst = np.fft.rfft(first, n=length, axis=0)
+    if second is None:
+        power = fFirst.real**2 + fFirst.imag**2
+    else:
+        second = np.moveaxis(np.asarray(second, dtype=float), axis, 0)
+        power = fFirst.conj() * np.fft.rfft(second, n=length, axis=0)
+    corr = np.fft.irfft(power, n=length, axis=0)[:nTimes]
+    if average:
+        corr /= (nTimes - np.arange(nTimes)).reshape((-1,) + (1,)*(corr.ndim-1))
+    return np.moveaxis(corr, 0, axis)
+
+
+def vector_correlate(first, second=None, average=True):
+    ''' Correlation of vector series (T, ..., 3) summed over the last (Cartesian) axis '''
+    return correlate(first, second, axis=0, average=average).sum(axis=-1)
@@ -10,6 +10,7 @@ from dlpoly.control import Control
 from dlpoly.config import Config
 from dlpoly.field import Field
 from dlpoly.statis import Statis
+from dlpoly.cache import FileCache
 from dlpoly.cli import get_command_args
 
 
@@ -17,13 +18,18 @@ class DLPoly:
     """ Main class of a DLPOLY runnable set of instructions """
     __version__ = "4.10"  # which version of dlpoly supports
 
-    def __init__(self, control=None, config=None, field=None, statis=None, output=None, workdir=None):
+    def __init__(self, control=None, config=None, field=None, statis=None, output=None, workdir=None,
+                 lazy=True, cache=None):
         # Default to having a control
         self.control = Control()
         self.config = None
         self.field = None
         self.statis = None
         self.workdir = workdir
+        # Defer parsing config, field and statis until their data are first used
+        self.lazy = lazy
+        # Reuse previously parsed config, field and statis (True for default FileCache)
+        self.cache = FileCache() if cache is True else cache
 
         if control is not None:
             self.load_control(control)
@@ -79,32 +85,48 @@ class DLPoly:
         else:
             print("Unable to find file: {}".format(source))
 
-    def load_field(self, source=None):
+    def load_field(self, source=None, lazy=None):
         """ Load field file into class """
         if source is None:
             source = self.fieldFile
+        if lazy is None:
+            lazy = self.lazy
         if os.path.isfile(source):
-            self.field = Field(source)
+            if self.cache:
+                self.field = self.cache.load(Field, source)
+            else:
+                self.field = Field(source, lazy=lazy)
             self.fieldFile = source
         else:
             print("Unable to find file: {}".format(source))
 
-    def load_config(self, source=None):
+    def load_config(self, source=None, lazy=None):
         """ Load config file into class """
         if source is None:
             source = self.configFile
+        if lazy is None:
+            lazy = self.lazy
         if os.path.isfile(source):
-            self.config = Config(source)
+            if self.cache:
+                self.config = self.cache.load(Config, source)
+            else:
+                self.config = Config(source, lazy=lazy)
             self.configFile = source
         else:
             print("Unable to find file: {}".format(source))
 
-    def load_statis(self, source=None):
+    def load_statis(self, source=None, lazy=None):
         """ Load statis file into class """
         if source is None:
             source = self.statisFile
+        if lazy is None:
+            lazy = self.lazy
         if os.path.isfile(source):
-            self.config = Statis(source)
+            if self.cache:
+                self.statis = self.cache.load(Statis, source)
+                self.statis.gen_labels(self.control, self.config)
+            else:
+                self.statis = Statis(source, self.control, self.config, lazy=lazy)
             self.statisFile = source
         else:
             print("Unable to find file: {}".format(source))
@@ -143,16 +165,19 @@ class DLPoly:
     @property
     def statisFile(self):
         """ Path to statis file """
-        return self.control.io.outstats
+        return self.control.io.outstat
 
     @statisFile.setter
     def statisFile(self, statis):
-        self.control.io.outstats = statis
+        self.control.io.outstat = statis
 
     def run(self, executable="DLPOLY.Z", modules=(),
-            numProcs=1, mpi='mpirun -n', outputFile=None):
+            numProcs=1, mpi='mpirun -n', outputFile=None, wait=True):
         """ this is very primitive one allowing the checking
-        for the existence of files and alteration of control parameters """
+        for the existence of files and alteration of control parameters
+
+        With wait False the running process is returned immediately, so the output
+        can be monitored (see dlpoly.follow) """
 
         try:
             os.mkdir(self.workdir)
@@ -186,7 +211,10 @@ class DLPoly:
         else:
             cmd = [runCommand]
         print(cmd)
-        subprocess.call(cmd, shell=True)
+        process = subprocess.Popen(cmd, shell=True)
+        if not wait:
+            return process
+        return process.wait()
 
 
 def main():
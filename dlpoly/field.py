@@ -5,7 +5,7 @@ Module containing data relating to DLPOLY field files
 from collections import defaultdict
 from abc import ABC
 from dlpoly.species import Species
-from dlpoly.utility import read_line, peek
+from dlpoly.utility import read_line, peek, LazyLoader, open_file
 
 
 class Interaction(ABC):
@@ -31,19 +31,31 @@ class Interaction(ABC):
 
 class Bond(Interaction):
     ''' Class containing information regarding bonds in molecules '''
-    nAtoms = {'atoms': 1, 'bonds': 2, 'constraints': 2, 'angles': 3, 'dihedrals': 4, 'inversions': 4, 'rigid': -1}
+    nAtoms = {'atoms': 1, 'bonds': 2, 'constraints': 2, 'angles': 3, 'dihedrals': 4, 'inversions': 4, 'rigid': -1,
+              'shell': 2}
+    # Classes whose records have no potential key, rigid lists its number of sites first
+    keyless = ('constraints', 'rigid', 'shell')
 
     def __init__(self, potClass=None, params=None):
         Interaction.__init__(self)
         self.potClass = potClass
-        # In bonds key comes first...
-        self.potType, params = params[0], params[1:]
-        self.atoms, self.params = params[0:self.nAtoms[potClass]], params[self.nAtoms[potClass]:]
+        if potClass in self.keyless:
+            self.potType = ''
+        else:
+            # In bonds key comes first...
+            self.potType, params = params[0], params[1:]
+        nAtoms = int(params[0]) if potClass == 'rigid' else self.nAtoms[potClass]
+        if potClass == 'rigid':
+            params = params[1:]
+        self.atoms, self.params = params[0:nAtoms], params[nAtoms:]
         # Atoms always in alphabetical/numerical order
         self.atoms = sorted(self.atoms)
 
     def __str__(self):
-        return '{} {} {}'.format(self.potType, ' '.join(self.atoms), ' '.join(self.params))
+        if self.potClass == 'rigid':  # Continuation lines of up to 16 entries
+            entries = [str(len(self.atoms))] + self.atoms
+            return '\n'.join(' '.join(entries[i:i+16]) for i in range(0, len(entries), 16))
+        return ' '.join(filter(None, (self.potType, ' '.join(self.atoms), ' '.join(self.params))))
 
 
 class Potential(Interaction):
@@ -120,7 +132,11 @@ class Molecule(PotHaver):
         self.name = ''
         self.nMols = 0
         self.species = {}
+        self.sites = []
 
+    nAtoms = property(lambda self: sum(site.repeats for site in self.sites))
+    # Species name of each atom of the molecule in order
+    siteNames = property(lambda self: [site.element for site in self.sites for _ in range(site.repeats)])
     activeBonds = property(lambda self: (name for name in Bond.nAtoms if self.get_num_pot_by_class(name)))
 
     def read(self, fieldFile):
@@ -139,13 +155,13 @@ class Molecule(PotHaver):
         ''' Write self to outFile '''
         print(self.name, file=outFile)
         print('nummols {}'.format(self.nMols), file=outFile)
-        print('atoms {}'.format(len(self.species)), file=outFile)
-        for element in self.species.values():
-            print(element, file=outFile)
+        print('atoms {}'.format(self.nAtoms), file=outFile)
+        for site in self.sites:
+            print(site, file=outFile)
 
         for potClass in self.activeBonds:
-            pots = self.get_pot_by_class(potClass)
-            print('{} {}'.format(potClass, len(list(pots)), file=outFile))
+            pots = list(self.get_pot_by_class(potClass))
+            print('{} {}'.format(potClass, len(pots)), file=outFile)
             for pot in pots:
                 print(pot, file=outFile)
         print('finish', file=outFile)
@@ -158,6 +174,9 @@ class Molecule(PotHaver):
 
         for pot in range(nPots):
             args = read_line(fieldFile).split()
+            if potClass == 'rigid':  # Sites may continue over several lines
+                while len(args) < int(args[0]) + 1:
+                    args += read_line(fieldFile).split()
             pot = Bond(potClass, args)
             self.add_potential(pot.atoms, pot)
 
@@ -170,21 +189,27 @@ class Molecule(PotHaver):
             else:
                 repeats, frozen = 1, False
             repeats = int(repeats)
-            self.species[name] = Species(name, len(self.species), charge, weight, frozen, repeats)
+            site = Species(name, len(self.species), charge, weight, bool(int(frozen)), repeats)
+            self.species.setdefault(name, site)
+            self.sites.append(site)
             atom += repeats
 
 
-class Field(PotHaver):
+class Field(PotHaver, LazyLoader):
     ''' Class containing field data '''
+    _deferred = ('header', 'units', 'molecules', 'pots')
 
-    def __init__(self, source=None):
+    def __init__(self, source=None, lazy=False):
         PotHaver.__init__(self)
         self.header = ''
         self.units = 'internal'
         self.molecules = {}
         if source is not None:
             self.source = source
-            self.read(self.source)
+            if lazy:
+                self.defer(self.source)
+            else:
+                self.read(self.source)
 
     vdws = property(lambda self: list(self.get_pot_by_class('vdw')))
     metals = property(lambda self: list(self.get_pot_by_class('metal')))
@@ -233,7 +258,7 @@ class Field(PotHaver):
 
     def read(self, fieldFile='FIELD'):
         ''' Read field file into data '''
-        with open(fieldFile, 'r') as inFile:
+        with open_file(fieldFile, 'r') as inFile:
             # Header *must* be first line?
             self.header = inFile.readline()
             key, self.units = read_line(inFile).split()
@@ -251,7 +276,7 @@ class Field(PotHaver):
 
     def write(self, fieldFile='FIELD'):
         ''' Write data to field file '''
-        with open(fieldFile, 'w') as outFile:
+        with open_file(fieldFile, 'w') as outFile:
             print(self.header, file=outFile)
             print('units {}'.format(self.units), file=outFile)
             print('molecules {}'.format(self.nMolecules), file=outFile)
@@ -0,0 +1,137 @@
+'''
+Module providing readers which follow DLPOLY output files as they are written
+'''
+
+import os
+import os.path
+from abc import ABC, abstractmethod
+from dlpoly.history import History
+from dlpoly.statis import parse_records
+from dlpoly.utility import read_appended
+
+
+class Follower(ABC):
+    ''' Base for readers returning only the complete records appended to a file since the last poll
+
+    The file position after the last complete record is kept, so each poll costs O(new data).
+    A partially written trailing record is left for a later poll. If the file shrinks (e.g.
+    a new run) reading restarts from the beginning.
+    '''
+    def __init__(self, filename):
+        self.filename = filename
+        self.position = 0
+
+    def poll(self):
+        ''' Records completed since the last poll '''
+        try:
+            size = os.path.getsize(self.filename)
+        except OSError:  # Not yet created
+            return self._parse([])[0]
+        if size < self.position:
+            self.reset()
+        lines, ends = read_appended(self.filename, self.position)
+        records, used = self._parse(lines)
+        if used:
+            self.position = int(ends[used-1])
+        return records
+
+    def reset(self):
+        ''' Start again from the beginning of the file '''
+        self.position = 0
+
+    @abstractmethod
+    def _parse(self, lines):
+        ''' Return records parsed from complete lines and the number of lines they use '''
+
+
+class StatisFollower(Follower):
+    ''' Follow a STATIS file, polling returns new rows as an (nRows, ncols+3) array '''
+    def __init__(self, filename='STATIS'):
+        Follower.__init__(self, filename)
+        self.header = []
+        self.columns = 0
+
+    def reset(self):
+        Follower.reset(self)
+        self.header = []
+        self.columns = 0
+
+    def _parse(self, lines):
+        skip = 0
+        if len(self.header) < 2:
+            skip = min(2 - len(self.header), len(lines))
+            self.header += lines[:skip]
+        data, used = parse_records(lines[skip:], self.columns)
+        self.columns = data.shape[1] - 3
+        return data, skip + used
+
+
+class OutputFollower(Follower):
+    ''' Follow an OUTPUT file, polling returns a list of new step blocks
+
+    Each block is a dict of the step, time and cpu and the instantaneous values keyed by
+    the names in the OUTPUT table header, with the rolling averages under 'averages'.
+    '''
+    def __init__(self, filename='OUTPUT'):
+        Follower.__init__(self, filename)
+        self.names = []
+
+    def reset(self):
+        Follower.reset(self)
+        self.names = []
+
+    def _parse(self, lines):
+        blocks = []
+        nLines = len(lines)
+        i = 0
+        while i < nLines:
+            tokens = lines[i].split()
+            if tokens and tokens[0] == 'step':
+                if i + 2 >= nLines:
+                    break
+                self.names = [name for line in lines[i:i+3] for name in line.split()[-9:]]
+                i += 3
+            elif self.names and len(tokens) == 10 and tokens[0].isdigit():
+                # Values, blank, rolling averages and closing rule
+                if i + 7 >= nLines:
+                    break
+                if not lines[i+4].lstrip().startswith('rolling'):
+                    i += 1
+                    continue
+                values = [line.split() for line in lines[i:i+3]]
+                averages = [line.split()[-9:] for line in lines[i+4:i+7]]
+                block = {'step': int(values[0][0]), 'time': float(values[1][0]), 'cpu': float(values[2][0])}
+                block.update(zip(self.names, (float(val) for row in values for val in row[1:])))
+                block['averages'] = dict(zip(self.names, (float(val) for row in averages for val in row)))
+                blocks.append(block)
+                i += 8
+            else:
+                i += 1
+        return blocks, i
+
+
+class HistoryFollower():
+    ''' Follow a HISTORY file, polling returns the list of frames completed since the last poll '''
+    def __init__(self, filename='HISTORY'):
+        self.filename = filename
+        self.history = None
+        self.seen = 0
+
+    def poll(self):
+        ''' Frames completed since the last poll '''
+        if self.history is None:
+            if not os.path.isfile(self.filename) or not os.path.getsize(self.filename):
+                return []
+            self.history = History(self.filename, persist=False)
+        else:
+            self.history.refresh()
+        if self.history.nFrames < self.seen:  # File restarted
+            self.seen = 0
+        frames = list(self.history.iter_frames(self.seen))
+        self.seen = self.history.nFrames
+        return frames
+
+    def close(self):
+        ''' Release the file '''
+        if self.history is not None:
+            self.history.close()
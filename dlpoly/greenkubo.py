@@ -0,0 +1,130 @@
+'''
+Module to calculate Green-Kubo transport coefficients from STATIS stress tensors and heat fluxes
+'''
+
+import numpy as np
+from dlpoly.correlation import correlate
+from dlpoly.timeseries import integrated_autocorrelation_time
+
+# SI conversions of DL_POLY units
+BOLTZMANN = 1.380649e-23       # J/K
+KATM_TO_PA = 1.01325e8
+ANGSTROM3_TO_M3 = 1e-30
+PS_TO_S = 1e-12
+# Heat flux in internal units (10 J/mol) A ps^-1 A^-3 to W m^-2
+FLUX_TO_SI = 10. / 6.02214076e23 / (1e-20 * PS_TO_S)
+
+
+def segment_correlations(series, segmentRows, maxLag):
+    ''' Sum over columns of autocorrelations of fluctuations, within each segment of rows
+
+    series: (nRows, nColumns) array, split into nRows // segmentRows segments each averaged over
+            all of its time origins by FFT, one column at a time to bound memory
+    Returns: (nSegments, maxLag) array
+    '''
+    series = np.asarray(series, dtype=float).reshape(len(series), -1)
+    nSegments = len(series) // segmentRows
+    if not nSegments or maxLag > segmentRows:
+        raise ValueError('Segments of {} rows too long or lag {} too long for {} rows'.format(
+            segmentRows, maxLag, len(series)))
+    corr = np.zeros((nSegments, maxLag))
+    for segment in range(nSegments):
+        block = series[segment*segmentRows:(segment+1)*segmentRows]
+        block = block - block.mean(axis=0)
+        for column in block.T:
+            corr[segment] += correlate(column)[:maxLag]
+    return corr
+
+
+def running_integral(corr, step):
+    ''' Cumulative trapezoidal integral of correlation functions along the last axis '''
+    corr = np.asarray(corr)
+    total = np.cumsum(corr, axis=-1) - (corr[..., :1] + corr) / 2
+    return total * step
+
+
+class GreenKubo():
+    ''' Green-Kubo transport coefficients from a Statis (with its control, so the stress tensor is known)
+
+    volume, temperature: A^3 and K, by default the averages over the rows used
+    heatFlux: (nRows, 3) heat flux in internal units for each STATIS row, e.g. from a
+              heat_flux run, for the thermal conductivity
+    rows: rows of STATIS to use, e.g. slice(start) to skip equilibration
+    segmentRows: rows correlated together (default all, up to maxRows). Longer series are split
+                 into segments whose spread gives the uncertainty of each coefficient
+    maxLag: number of lags to correlate to, by default decayLags integrated autocorrelation times
+            of the stress (see dlpoly.timeseries), up to half a segment
+
+    After calculation, lags (ps) and for each of 'shear', 'bulk' (and 'thermal') the summed
+    autocorrelation acf[name] and running integral[name] (Pa s and W m^-1 K^-1) averaged over
+    segments, with segments[name] (nSegments, nLags) integrals for convergence diagnostics.
+    '''
+    maxRows = 1 << 20
+    decayLags = 20
+
+    def __init__(self, source=None, volume=None, temperature=None, heatFlux=None, rows=slice(None),
+                 segmentRows=None, maxLag=None):
+        self.lags = np.zeros(0)
+        self.acf = {}
+        self.integral = {}
+        self.segments = {}
+        if source is not None:
+            self.calculate(source, volume, temperature, heatFlux, rows, segmentRows, maxLag)
+
+    def calculate(self, source, volume=None, temperature=None, heatFlux=None, rows=slice(None),
+                  segmentRows=None, maxLag=None):
+        ''' Correlate stress (and heat flux) fluctuations of each segment of rows '''
+        if 'stress' not in source:
+            raise ValueError('Stress tensor columns not labelled, read STATIS with the run control')
+        times = source.time[rows]
+        step = np.diff(times)
+        if not len(step) or np.ptp(step) > 1e-6 * step.mean():
+            raise ValueError('Green-Kubo integrals require STATIS rows evenly spaced in time')
+        step = step.mean()
+        volume = source['volume'][rows].mean() if volume is None else volume
+        temperature = source['temperature'][rows].mean() if temperature is None else temperature
+
+        nRows = len(times)
+        segmentRows = min(nRows, self.maxRows) if segmentRows is None else segmentRows
+
+        stress = source['stress'][rows].reshape(-1, 3, 3)
+        pressure = np.trace(stress, axis1=1, axis2=2) / 3
+        # Symmetric traceless stress, whose nine components give 10 times the shear correlation
+        traceless = (stress + stress.transpose(0, 2, 1)) / 2 - pressure[:, None, None] * np.eye(3)
+        if maxLag is None:
+            tau = integrated_autocorrelation_time(np.column_stack((traceless.reshape(-1, 9),
+                                                                   pressure))[:segmentRows])
+            maxLag = int(min(segmentRows // 2, self.decayLags * np.max(tau) + 1))
+        self.lags = np.arange(maxLag) * step
+        factor = volume * ANGSTROM3_TO_M3 * KATM_TO_PA**2 * PS_TO_S / (BOLTZMANN * temperature)
+        quantities = {'shear': (traceless.reshape(-1, 9), factor / 10),
+                      'bulk': (pressure, factor)}
+        if heatFlux is not None:
+            heatFlux = np.asarray(heatFlux, dtype=float)[rows]
+            quantities['thermal'] = (heatFlux, volume * ANGSTROM3_TO_M3 * FLUX_TO_SI**2 * PS_TO_S /
+                                     (3 * BOLTZMANN * temperature**2))
+
+        for name, (series, scale) in quantities.items():
+            corr = segment_correlations(series, segmentRows, maxLag) * scale
+            self.acf[name] = corr.mean(axis=0)
+            self.segments[name] = running_integral(corr, step)
+            self.integral[name] = self.segments[name].mean(axis=0)
+        return self
+
+    def coefficient(self, name='shear', fitRange=(0.5, 1.)):
+        ''' Plateau of a running integral and its uncertainty
+
+        fitRange: fraction of the lags averaged over, after the correlation has decayed
+        Returns: value and its standard error from the spread of segments, or from the fluctuation
+                 of the running integral over the fitted lags for a single segment
+        '''
+        nLags = len(self.lags)
+        fit = slice(int(fitRange[0]*nLags), max(int(fitRange[1]*nLags), int(fitRange[0]*nLags) + 1))
+        plateaus = self.segments[name][:, fit].mean(axis=1)
+        if len(plateaus) > 1:
+            return plateaus.mean(), plateaus.std(ddof=1) / np.sqrt(len(plateaus))
+        return plateaus[0], self.integral[name][fit].std()
+
+    shear_viscosity = property(lambda self: self.coefficient('shear'))
+    bulk_viscosity = property(lambda self: self.coefficient('bulk'))
+    thermal_conductivity = property(lambda self: self.coefficient('thermal'))
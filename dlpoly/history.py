@@ -0,0 +1,353 @@
+'''
+Module to handle DLPOLY HISTORY trajectory files
+'''
+
+import mmap
+import os
+import numpy as np
+from dlpoly.config import Config, read_atom_block, write_atom_block
+from dlpoly.utility import COMPRESSION, compression_of, open_file
+
+
+class Frame(Config):
+    ''' Single HISTORY frame: a Config with its step, time and per-atom mass, charge and displacement '''
+    def __init__(self):
+        Config.__init__(self)
+        self.step = 0
+        self.time = 0.
+        self.timestep = 0.
+        self.masses = np.zeros(0)
+        self.charges = np.zeros(0)
+        self.displacements = np.zeros(0)
+
+
+class HistoryWriter():
+    ''' Write frames to a formatted HISTORY file
+
+    The frame and record counts in the header are filled in when the writer is closed
+    (or omitted for compressed output, which cannot be rewound).
+    '''
+    def __init__(self, filename='new.history', title='', level=0, pbc=0, natoms=0, compression=None):
+        self.level = level
+        self.pbc = pbc
+        self.natoms = natoms
+        self.frames = 0
+        self.records = 2
+        self._outFile = open_file(filename, 'w', compression)
+        self._outFile.write('{0:72s}\n'.format(title))
+        self._outFile.write('{0:10d}{1:10d}{2:10d}'.format(level, pbc, natoms))
+        # Compressed streams may claim to be seekable but cannot be rewound for writing
+        rewindable = (COMPRESSION[compression] if compression else compression_of(filename, 'w')) is None
+        self._countPos = self._outFile.tell() if rewindable else None
+        if self._countPos is not None:
+            self._outFile.write('{0:21d}{1:21d}'.format(0, 0))
+        self._outFile.write('\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, frame):
+        ''' Append frame (a Frame or Config with step and time) '''
+        natoms = frame.natoms
+        timestep = getattr(frame, 'timestep', 0.)
+        step = getattr(frame, 'step', self.frames)
+        time = getattr(frame, 'time', step*timestep)
+        self._outFile.write('timestep{0:10d}{1:10d}{2:10d}{3:10d}{4:20.6f}{5:20.6f}\n'.format(
+            step, natoms, self.level, self.pbc, timestep, time))
+        if self.pbc > 0:
+            for j in range(3):
+                self._outFile.write('{0:20.10f}{1:20.10f}{2:20.10f}\n'.format(*frame.cell[j]))
+        extra = [getattr(frame, key, np.zeros(0)) for key in ('masses', 'charges', 'displacements')]
+        extra = [column if len(column) == natoms else np.zeros(natoms) for column in extra]
+        write_atom_block(self._outFile, frame.elements, frame.indices,
+                         (frame.positions, frame.velocities, frame.forces), self.level, extra=extra)
+        self.frames += 1
+        self.records += 1 + (3 if self.pbc > 0 else 0) + natoms*(self.level+2)
+
+    def close(self):
+        ''' Finish file, filling in the number of frames and records '''
+        if self._outFile.closed:
+            return
+        try:
+            if self._countPos is not None:
+                self._outFile.seek(self._countPos)
+                self._outFile.write('{0:21d}{1:21d}'.format(self.frames, self.records))
+        finally:
+            self._outFile.close()
+
+
+class History():
+    ''' Indexed formatted HISTORY file with random access to frames
+
+    On first open the file is scanned once to record the byte offset, step, time, cell,
+    number of atoms, level and pbc of every complete frame. The index is saved alongside
+    the file (indexFile, default HISTORY.idx.npz) and reused, or extended if the file has grown.
+    An index (or part of one, from frame_index) may be given to open the file without scanning.
+    '''
+    _indexKeys = ('offsets', 'ends', 'steps', 'times', 'timesteps', 'natoms', 'levels', 'pbcs', 'cells')
+    _indexTypes = (np.int64, np.int64, np.int64, float, float, np.int64, np.int64, np.int64, float)
+    _scanChunk = 1 << 24
+
+    def __init__(self, source='HISTORY', indexFile=None, persist=True, index=None):
+        if compression_of(source):
+            raise ValueError('Cannot index compressed file {}, decompress it first'.format(source))
+        self.source = source
+        self.indexFile = source + '.idx.npz' if indexFile is None else indexFile
+        self.persist = persist
+        self._file = open(source, 'rb')
+        self._map = None
+        self.title = ''
+        if index is None:
+            self._reset_index()
+            self.refresh()
+        else:
+            self.index = index
+            self._open_map()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.nFrames
+
+    def __getitem__(self, ind):
+        if isinstance(ind, slice):
+            return list(self.iter_frames(*ind.indices(self.nFrames)))
+        if ind < 0:
+            ind += self.nFrames
+        if not 0 <= ind < self.nFrames:
+            raise IndexError('Frame {} out of range'.format(ind))
+        return self.read_frame(ind)
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    nFrames = property(lambda self: len(self.index['offsets']))
+    steps = property(lambda self: self.index['steps'])
+    times = property(lambda self: self.index['times'])
+    cells = property(lambda self: self.index['cells'])
+    natoms = property(lambda self: self.index['natoms'])
+    levels = property(lambda self: self.index['levels'])
+    pbcs = property(lambda self: self.index['pbcs'])
+
+    def close(self):
+        ''' Release the file '''
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def refresh(self):
+        ''' Bring the index up to date with the file, scanning only new data '''
+        size = self._open_map()
+        if not size:
+            return self
+        if self.nFrames and self.index['ends'][-1] > size:  # File replaced
+            self._reset_index()
+        if not self.nFrames and not self._load_index():
+            self._reset_index()
+        start = self.index['ends'][-1] if self.nFrames else self._first_frame()
+        if start >= 0:
+            self._scan(int(start))
+        if self.persist:
+            self._save_index()
+        return self
+
+    def frame_index(self, frames=slice(None)):
+        ''' Index entries of the selected frames (index, slice or sequence) '''
+        inds = np.atleast_1d(np.arange(self.nFrames)[frames])
+        return {key: val[inds] for key, val in self.index.items()}
+
+    def read_frame(self, ind):
+        ''' Parse frame ind into a Frame '''
+        lines = self._map[self.index['offsets'][ind]:self.index['ends'][ind]].decode().splitlines()
+        level, pbc = int(self.index['levels'][ind]), int(self.index['pbcs'][ind])
+        frame = Frame()
+        frame.title = self.title
+        frame.level, frame.pbc = level, pbc
+        frame.cell = self.index['cells'][ind].copy()
+        frame.step = int(self.index['steps'][ind])
+        frame.time = float(self.index['times'][ind])
+        frame.timestep = float(self.index['timesteps'][ind])
+        (frame.elements, frame.indices,
+         frame.positions, frame.velocities, frame.forces, extra) = read_atom_block(lines[4 if pbc else 1:], level)
+        if extra.shape[1] >= 2:
+            frame.masses, frame.charges = extra[:, 0].astype(float), extra[:, 1].astype(float)
+        if extra.shape[1] >= 3:
+            frame.displacements = extra[:, 2].astype(float)
+        return frame
+
+    def iter_frames(self, start=0, stop=None, step=1):
+        ''' Yield frames start:stop:step '''
+        for ind in range(*slice(start, stop, step).indices(self.nFrames)):
+            yield self.read_frame(ind)
+
+    def positions(self, frames=slice(None)):
+        ''' Positions of the selected frames (index, slice or sequence) as an (nFrames, natoms, 3) array '''
+        return self._stack(frames, 'positions')
+
+    def velocities(self, frames=slice(None)):
+        ''' Velocities of the selected frames as an (nFrames, natoms, 3) array '''
+        return self._stack(frames, 'velocities')
+
+    def forces(self, frames=slice(None)):
+        ''' Forces on the selected frames as an (nFrames, natoms, 3) array '''
+        return self._stack(frames, 'forces')
+
+    def _stack(self, frames, key):
+        inds = np.arange(self.nFrames)[frames]
+        return np.stack([getattr(self.read_frame(ind), key) for ind in np.atleast_1d(inds)])
+
+    def _open_map(self):
+        ''' Map the current extent of the file, returning its size '''
+        size = os.fstat(self._file.fileno()).st_size
+        if size and (self._map is None or len(self._map) != size):
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.title = self._map[:self._map.find(b'\n')].decode().strip()
+        return size
+
+    def _reset_index(self):
+        self.index = {key: np.zeros(0, dtype=dType) for key, dType in zip(self._indexKeys, self._indexTypes)}
+        self.index['cells'] = np.zeros((0, 3, 3))
+
+    def _first_frame(self):
+        ''' Offset of first timestep line or -1 '''
+        if self._map[:8] == b'timestep':
+            return 0
+        pos = self._map.find(b'\ntimestep')
+        return pos + 1 if pos >= 0 else -1
+
+    def _end_of_lines(self, start, nLines):
+        ''' Offset just past nLines complete lines from start, or -1 if the file ends first '''
+        pos = start
+        size = len(self._map)
+        if nLines <= 8:  # Header lines, avoid copying a chunk
+            for _ in range(nLines):
+                pos = self._map.find(b'\n', pos) + 1
+                if not pos:
+                    return -1
+            return pos
+        while pos < size:
+            chunk = np.frombuffer(self._map[pos:min(pos + self._scanChunk, size)], dtype=np.uint8)
+            newlines = np.flatnonzero(chunk == 10)
+            if len(newlines) >= nLines:
+                return pos + int(newlines[nLines-1]) + 1
+            nLines -= len(newlines)
+            pos += len(chunk)
+        return -1
+
+    def _read_header(self, pos):
+        ''' Parse timestep and cell lines of frame at pos '''
+        end = self._end_of_lines(pos, 1)
+        if end < 0:
+            return None
+        _, step, natoms, level, pbc, *times = self._map[pos:end].split()
+        step, natoms, level, pbc = int(step), int(natoms), int(level), int(pbc)
+        timestep = float(times[0]) if times else 0.
+        time = float(times[1]) if len(times) > 1 else step*timestep
+        cell = np.zeros((3, 3))
+        if pbc > 0:
+            cellEnd = self._end_of_lines(end, 3)
+            if cellEnd < 0:
+                return None
+            cell = np.asarray([line.split()[:3] for line in self._map[end:cellEnd].splitlines()], dtype=float)
+        return step, time, timestep, natoms, level, pbc, cell
+
+    def _scan(self, pos):
+        ''' Index complete frames from pos to end of file '''
+        size = len(self._map)
+        found = {key: [] for key in self._indexKeys}
+        expected = None
+        while 0 <= pos < size:
+            if self._map[pos:pos+8] != b'timestep':
+                pos = self._map.find(b'\ntimestep', pos)
+                if pos < 0:
+                    break
+                pos += 1
+            header = self._read_header(pos)
+            if header is None:
+                break
+            step, time, timestep, natoms, level, pbc, cell = header
+
+            # Fixed width frames follow at the same stride as the last
+            shape = (natoms, level, pbc)
+            end = -1
+            if expected is not None and expected[0] == shape:
+                end = pos + expected[1]
+                if not (end <= size and self._map[end-1:end] == b'\n' and
+                        (end == size or self._map[end:end+8] == b'timestep')):
+                    end = -1
+            if end < 0:
+                end = self._end_of_lines(pos, 1 + (3 if pbc > 0 else 0) + natoms*(level+2))
+                if end < 0:  # Incomplete final frame
+                    break
+                expected = (shape, end - pos)
+
+            for key, val in zip(self._indexKeys, (pos, end, step, time, timestep, natoms, level, pbc, cell)):
+                found[key].append(val)
+            pos = end
+
+        if found['offsets']:
+            found['cells'] = np.asarray(found['cells']).reshape(-1, 3, 3)
+            self.index = {key: np.concatenate((self.index[key], np.asarray(found[key], dtype=self.index[key].dtype)))
+                          for key in self._indexKeys}
+
+    def _signature(self):
+        ''' Title line used to check an index belongs to the file
+
+        The second header line is excluded as DL_POLY rewrites its frame and record counts as the file grows
+        '''
+        end = self._map.find(b'\n', 0, 256)
+        return np.frombuffer(self._map[:end if end >= 0 else 256], dtype=np.uint8)
+
+    def _last_header(self):
+        ''' Timestep and cell lines of the last indexed frame '''
+        if not self.nFrames:
+            return np.zeros(0, dtype=np.uint8)
+        pos = int(self.index['offsets'][-1])
+        end = self._end_of_lines(pos, 4 if self.index['pbcs'][-1] > 0 else 1)
+        return np.frombuffer(self._map[pos:max(pos, end)], dtype=np.uint8)
+
+    def _load_index(self):
+        ''' Load a saved index if it matches the file
+
+        The index is reused if the file is unchanged since it was saved, or has grown with the last
+        indexed frame still in place. A file rewritten in place (e.g. by a rerun) is rescanned.
+        '''
+        try:
+            with np.load(self.indexFile) as saved:
+                stored = {key: saved[key] for key in saved.files}
+        except (OSError, ValueError):
+            return False
+        if not all(key in stored for key in ('signature', 'size', 'mtime', 'header')):
+            return False
+        if not np.array_equal(stored['signature'], self._signature()) or stored['size'] > len(self._map):
+            return False
+        self.index = {key: stored[key] for key in self._indexKeys}
+        self.index['cells'] = self.index['cells'].reshape(-1, 3, 3)
+        if stored['size'] == len(self._map):
+            valid = stored['mtime'] == self._mtime()
+        else:
+            valid = np.array_equal(stored['header'], self._last_header())
+        if not valid:
+            self._reset_index()
+        return valid
+
+    def _mtime(self):
+        return os.fstat(self._file.fileno()).st_mtime_ns
+
+    def _save_index(self):
+        ''' Save index next to the file if possible '''
+        try:
+            with open(self.indexFile, 'wb') as outFile:
+                np.savez(outFile, size=len(self._map), mtime=self._mtime(), signature=self._signature(),
+                         header=self._last_header(), **self.index)
+        except OSError:
+            pass
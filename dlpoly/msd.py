@@ -0,0 +1,81 @@
+'''
+Module to calculate mean squared displacements and diffusion coefficients from trajectories
+'''
+
+import numpy as np
+from dlpoly.correlation import vector_correlate
+from dlpoly.pbc import unwrap_trajectory
+from dlpoly.trajectory import atom_chunked, atom_groups, trajectory_array
+
+
+def msd_fft(positions):
+    ''' Mean squared displacement of each atom averaged over time origins, by FFT
+
+    positions: (nFrames, nAtoms, 3) unwrapped positions
+    Returns: (nFrames, nAtoms) MSD at lags 0..nFrames-1
+    '''
+    positions = np.asarray(positions, dtype=float)
+    nTimes = len(positions)
+    sqr = np.einsum('tni,tni->tn', positions, positions)
+    cumulative = np.concatenate((np.zeros((1,) + sqr.shape[1:]), np.cumsum(sqr, axis=0)))
+    lags = np.arange(nTimes)
+    # Sum over origins of r^2(t0) + r^2(t0+t)
+    squares = (cumulative[-1] - cumulative[lags] + cumulative[nTimes - lags]) / (nTimes - lags)[:, None]
+    return squares - 2.*vector_correlate(positions)
+
+
+class MSD():
+    ''' Mean squared displacement of groups of atoms from a HISTORY file or binary store
+
+    groups: 'element' to average per species, None for all atoms, or a label per atom
+            (e.g. molecule names or numbers) to average over atoms sharing a label
+    chunkAtoms: atoms processed at once (default: sized to maxBytes of working memory); a HISTORY
+                file needing several chunks is read once into a temporary binary store
+                (see dlpoly.trajectory.atom_chunked)
+    unwrap: remove periodic boundary jumps before computing displacements
+
+    After calculation, labels, counts, times and msd (nGroups, nFrames) are available.
+    '''
+    maxBytes = 1 << 28
+
+    def __init__(self, source=None, groups='element', frames=slice(None), chunkAtoms=None, unwrap=True):
+        self.labels = []
+        self.counts = np.zeros(0, dtype=int)
+        self.times = np.zeros(0)
+        self.msd = np.zeros((0, 0))
+        if source is not None:
+            self.calculate(source, groups, frames, chunkAtoms, unwrap)
+
+    def calculate(self, source, groups='element', frames=slice(None), chunkAtoms=None, unwrap=True):
+        ''' Accumulate MSD of each group over chunks of atoms '''
+        with atom_chunked(source, 'positions', frames, chunkAtoms, self.maxBytes) as (traj, inds, first, chunkAtoms):
+            nAtoms, nTimes = first.natoms, len(inds)
+            self.labels, groupIDs, self.counts = atom_groups(first, groups)
+            self.times = traj.times[inds] - traj.times[inds[0]]
+
+            cells, pbc = traj.cells[inds], first.pbc
+            totals = np.zeros((len(self.labels), nTimes))
+            for start in range(0, nAtoms, chunkAtoms):
+                atoms = slice(start, min(start + chunkAtoms, nAtoms))
+                positions = trajectory_array(traj, 'positions', inds, atoms)
+                if unwrap:
+                    positions = unwrap_trajectory(positions, cells, pbc)
+                np.add.at(totals, groupIDs[atoms], msd_fft(positions).T)
+
+        self.msd = totals / self.counts[:, None]
+        return self
+
+    def __getitem__(self, label):
+        return self.msd[self.labels.index(label)]
+
+    def diffusion(self, fitRange=(0.1, 0.5), dims=3):
+        ''' Diffusion coefficient of each group from a linear fit of MSD against time
+
+        fitRange: fraction of the time range to fit over, avoiding the ballistic regime and
+                  poorly averaged long lags
+        Returns: dict of label to diffusion coefficient in units of the trajectory (A^2/ps)
+        '''
+        nTimes = len(self.times)
+        fit = slice(int(fitRange[0]*nTimes), max(int(fitRange[1]*nTimes), int(fitRange[0]*nTimes) + 2))
+        slopes = np.polyfit(self.times[fit], self.msd[:, fit].T, 1)[0]
+        return dict(zip(self.labels, np.atleast_1d(slopes) / (2*dims)))
@@ -0,0 +1,182 @@
+'''
+Module providing linked-cell neighbour searching for DLPOLY configurations
+'''
+
+import itertools
+import numpy as np
+from dlpoly.pbc import periodic_dims, perpendicular_widths, to_fractional, minimum_image
+
+
+class CellList():
+    ''' Linked-cell (spatial hash) index of positions for finding pairs within a cutoff
+
+    Handles orthorhombic and triclinic cells with the minimum image convention along
+    periodic directions (pbc as in CONFIG). Cost scales linearly with the number of atoms.
+    '''
+    maxBlock = 1 << 22  # Candidate pairs considered at once
+
+    def __init__(self, positions, cell, pbc, cutoff):
+        self.positions = np.asarray(positions, dtype=float)
+        self.cutoff = float(cutoff)
+        self.pbc = pbc
+        self.periodic = periodic_dims(pbc)
+        nAtoms = len(self.positions)
+
+        if self.periodic.any():
+            self.cell = np.asarray(cell, dtype=float)
+            widths = perpendicular_widths(self.cell)
+            if np.any(self.cutoff > widths[self.periodic] / 2):
+                raise ValueError('Cutoff {} exceeds half the cell width {}'.format(
+                    self.cutoff, widths[self.periodic].min()))
+            self._origin = np.zeros(3)
+        else:  # No cell, bin on bounding box
+            lo, hi = (self.positions.min(axis=0), self.positions.max(axis=0)) if nAtoms else (0., 1.)
+            self.cell = np.diag(np.maximum(hi - lo, self.cutoff))
+            widths = np.diag(self.cell).copy()
+            self._origin = lo
+
+        # Non-periodic directions are binned over their occupied range only
+        self._lo, self._span = np.zeros(3), np.ones(3)
+        frac = to_fractional(self.positions - self._origin, self.cell)
+        for dim in np.flatnonzero(~self.periodic):
+            if nAtoms:
+                self._lo[dim] = frac[:, dim].min()
+                self._span[dim] = max(frac[:, dim].max() - self._lo[dim], self.cutoff / widths[dim])
+                widths[dim] *= self._span[dim]
+
+        nCells = np.maximum(np.floor(widths / self.cutoff).astype(int), 1)
+        # Avoid many more cells than atoms for sparse systems
+        excess = np.prod(nCells.astype(float)) / (2*nAtoms + 27)
+        if excess > 1:
+            nCells = np.maximum((nCells / excess**(1/3)).astype(int), 1)
+        self.nCells = nCells
+
+        cellCoords = self._cell_coords(self.positions)
+        self._cellCoords = cellCoords
+        cellID = np.ravel_multi_index(cellCoords.T, nCells)
+        self._order = np.argsort(cellID, kind='stable')
+        self._counts = np.bincount(cellID, minlength=np.prod(nCells))
+        self._starts = np.cumsum(self._counts) - self._counts
+
+    def _cell_coords(self, points):
+        ''' Integer cell coordinates of points '''
+        frac = to_fractional(points - self._origin, self.cell)
+        frac[:, self.periodic] %= 1.
+        frac = (frac - self._lo) / self._span
+        return np.clip((frac * self.nCells).astype(int), 0, self.nCells - 1)
+
+    def _offsets(self):
+        ''' Distinct neighbouring cell shifts along each direction '''
+        shifts = []
+        for nCell, periodic in zip(self.nCells, self.periodic):
+            if periodic:
+                shifts.append(sorted({shift % nCell for shift in (-1, 0, 1)}))
+            else:
+                shifts.append([-1, 0, 1] if nCell > 1 else [0])
+        return [np.asarray(offset) for offset in itertools.product(*shifts)]
+
+    def _neg(self, offset):
+        ''' Shift equivalent to -offset '''
+        return np.where(self.periodic, -offset % self.nCells, -offset)
+
+    def _shift_cells(self, coords, offset):
+        ''' Flat index of cells shifted by offset, -1 where outside a non-periodic direction '''
+        shifted = coords + offset
+        outside = np.any(((shifted < 0) | (shifted >= self.nCells)) & ~self.periodic, axis=1)
+        cells = np.ravel_multi_index((shifted % self.nCells).T, self.nCells)
+        cells[outside] = -1
+        return cells
+
+    def _candidates(self, source, cells):
+        ''' Yield blocks of (source, target) atom pairs between source atoms and all atoms in cells '''
+        counts = np.where(cells >= 0, self._counts[np.maximum(cells, 0)], 0)
+        cumulative = np.cumsum(counts)
+        start = 0
+        while start < len(source):
+            # Take at least one source atom, at most maxBlock candidates
+            limit = (cumulative[start-1] if start else 0) + self.maxBlock
+            end = max(start + 1, np.searchsorted(cumulative, limit, side='right'))
+            blockCounts = counts[start:end]
+            total = blockCounts.sum()
+            if total:
+                first = np.repeat(source[start:end], blockCounts)
+                within = np.arange(total) - np.repeat(np.cumsum(blockCounts) - blockCounts, blockCounts)
+                second = self._order[np.repeat(self._starts[cells[start:end]], blockCounts) + within]
+                yield first, second
+            start = end
+
+    def _distances(self, vectors):
+        return np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+
+    def _separation(self, first, second, points=None):
+        origins = self.positions[first] if points is None else points[first]
+        vectors = self.positions[second] - origins
+        if self.periodic.any():
+            vectors = minimum_image(vectors, self.cell, self.pbc)
+        return vectors
+
+    def pairs(self, cutoff=None, vectors=False):
+        ''' Unique pairs i < j closer than cutoff (default: that of the index)
+
+        Returns: i, j, distance (and separation vectors r_j - r_i if vectors) as arrays
+        '''
+        cutoff = self.cutoff if cutoff is None else min(cutoff, self.cutoff)
+        source = self._order
+        coords = self._cellCoords[source]
+        found = []
+        for offset in self._offsets():
+            negOffset = self._neg(offset)
+            selfInverse = np.array_equal(offset, negOffset)
+            # Each pair of distinct cells only visited from one side
+            if not selfInverse and tuple(offset) < tuple(negOffset):
+                continue
+            cells = self._shift_cells(coords, offset)
+            for first, second in self._candidates(source, cells):
+                if selfInverse:
+                    keep = first < second
+                    first, second = first[keep], second[keep]
+                sep = self._separation(first, second)
+                dist = self._distances(sep)
+                keep = dist < cutoff
+                found.append((first[keep], second[keep], dist[keep], sep[keep]))
+
+        return self._collect(found, vectors, ordered=True)
+
+    def query(self, points, cutoff=None, vectors=False):
+        ''' All (point, atom) pairs of external points and indexed atoms closer than cutoff
+
+        Returns: point index, atom index, distance (and separation vectors if vectors) as arrays
+        '''
+        cutoff = self.cutoff if cutoff is None else min(cutoff, self.cutoff)
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        coords = self._cell_coords(points)
+
+        source = np.arange(len(points))
+        found = []
+        for offset in self._offsets():
+            cells = self._shift_cells(coords, offset)
+            for first, second in self._candidates(source, cells):
+                sep = self._separation(first, second, points)
+                dist = self._distances(sep)
+                keep = dist < cutoff
+                found.append((first[keep], second[keep], dist[keep], sep[keep]))
+
+        return self._collect(found, vectors)
+
+    @staticmethod
+    def _collect(found, vectors, ordered=False):
+        if found:
+            first, second, dist, sep = (np.concatenate(arrays) for arrays in zip(*found))
+        else:
+            first, second, dist, sep = (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                                        np.zeros(0), np.zeros((0, 3)))
+        if ordered:  # Return as i < j
+            swap = first > second
+            first[swap], second[swap] = second[swap], first[swap]
+            sep[swap] *= -1
+        return (first, second, dist, sep) if vectors else (first, second, dist)
+
+
+def neighbour_pairs(config, cutoff, vectors=False):
+    ''' Unique pairs of atoms in config closer than cutoff as arrays i, j, distance '''
+    return CellList(config.positions, config.cell, config.pbc, cutoff).pairs(vectors=vectors)
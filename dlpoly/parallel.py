@@ -0,0 +1,65 @@
+'''
+Module to run map-reduce analyses over trajectory frames on a process pool
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import os
+import numpy as np
+from dlpoly.history import History
+from dlpoly.trajectory import BinaryTrajectory, open_trajectory
+
+
+def _open_part(source, index):
+    ''' Open source in a worker, by frame index for HISTORY files '''
+    if index is None:
+        return BinaryTrajectory(source)
+    return History(source, persist=False, index=index)
+
+
+def _map_part(source, index, frames, func, reduce):
+    ''' Apply func to frames of source and reduce them locally '''
+    with _open_part(source, index) as traj:
+        # HISTORY parts are opened with only their own frames indexed
+        results = (func(traj.read_frame(ind)) for ind in (frames if index is None else range(len(frames))))
+        return list(results) if reduce is None else functools.reduce(reduce, results)
+
+
+def map_frames(source, func, reduce=None, frames=slice(None), nWorkers=None, chunkFrames=None):
+    ''' Apply func to each selected frame of a trajectory on a process pool
+
+    source: HISTORY file, binary store (see dlpoly.trajectory) or an open History/BinaryTrajectory
+    func: function of a Frame, e.g. returning a histogram
+    reduce: function combining two results (e.g. operator.add); results are reduced in frame
+            order within each worker and the partial results combined, so only one result per
+            task is sent back. Without reduce the list of per-frame results is returned.
+    frames: index, slice or sequence of frames to process
+    nWorkers: processes to use (default: all cores); 1 runs in this process
+    chunkFrames: frames per task (default: about four tasks per worker)
+
+    func and reduce must be picklable, i.e. module level functions.
+    '''
+    traj = open_trajectory(source)
+    try:
+        inds = np.atleast_1d(np.arange(traj.nFrames)[frames])
+        history = isinstance(traj, History)
+        if not len(inds):
+            raise ValueError('No frames selected')
+
+        nWorkers = nWorkers or os.cpu_count() or 1
+        chunkFrames = chunkFrames or max(1, -(-len(inds) // (4 * nWorkers)))
+        tasks = [inds[start:start+chunkFrames] for start in range(0, len(inds), chunkFrames)]
+        args = [(traj.source, traj.frame_index(task) if history else None, task, func, reduce) for task in tasks]
+    finally:
+        if traj is not source:
+            traj.close()
+
+    if nWorkers == 1:
+        parts = [_map_part(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=nWorkers) as pool:
+            parts = list(pool.map(_map_part, *zip(*args)))
+
+    if reduce is None:
+        return [result for part in parts for result in part]
+    return functools.reduce(reduce, parts)
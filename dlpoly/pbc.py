@@ -0,0 +1,86 @@
+'''
+Module containing periodic boundary helpers for DLPOLY cells
+'''
+
+import numpy as np
+
+# Periodic directions for each DLPOLY imcon (pbc) key
+PERIODIC = {0: (False, False, False), 1: (True, True, True), 2: (True, True, True),
+            3: (True, True, True), 6: (True, True, False)}
+
+
+def periodic_dims(pbc):
+    ''' Boolean array of which cell vectors are periodic for pbc key '''
+    try:
+        return np.asarray(PERIODIC[pbc])
+    except KeyError:
+        raise ValueError('Unsupported pbc {}. Must be one of {}'.format(pbc, ', '.join(map(str, PERIODIC))))
+
+
+def perpendicular_widths(cell):
+    ''' Distance between opposite faces of the cell spanned by the rows of cell '''
+    volume = abs(np.linalg.det(cell))
+    areas = np.linalg.norm(np.cross(cell[[1, 2, 0]], cell[[2, 0, 1]]), axis=1)
+    return volume / areas
+
+
+def to_fractional(positions, cell):
+    ''' Convert Cartesian positions to fractional coordinates of cell '''
+    return np.asarray(positions) @ np.linalg.inv(cell)
+
+
+def to_cartesian(fractional, cell):
+    ''' Convert fractional coordinates of cell to Cartesian positions '''
+    return np.asarray(fractional) @ cell
+
+
+def wrap(positions, cell, pbc):
+    ''' Wrap positions into the (origin centred) primary cell along periodic directions '''
+    periodic = periodic_dims(pbc)
+    if not periodic.any():
+        return np.array(positions, dtype=float)
+    frac = to_fractional(positions, cell)
+    frac[..., periodic] -= np.round(frac[..., periodic])
+    return to_cartesian(frac, cell)
+
+
+def minimum_image(vectors, cell, pbc):
+    ''' Apply the minimum image convention to separation vectors '''
+    return wrap(vectors, cell, pbc)
+
+
+def unwrap_trajectory(positions, cells, pbc):
+    ''' Remove jumps across periodic boundaries from a trajectory of positions
+
+    positions: (nFrames, nAtoms, 3) wrapped positions
+    cells: (3, 3) cell or (nFrames, 3, 3) cells of each frame
+    Returns continuous positions starting from the first frame, assuming no atom moves
+    more than half a cell between frames
+    '''
+    positions = np.asarray(positions, dtype=float)
+    periodic = periodic_dims(pbc)
+    if not periodic.any() or len(positions) < 2:
+        return positions.copy()
+    cells = np.broadcast_to(cells, (len(positions), 3, 3))
+    steps = positions[1:] - positions[:-1]
+    frac = np.einsum('fni,fij->fnj', steps, np.linalg.inv(cells[1:]))
+    frac[..., periodic] -= np.round(frac[..., periodic])
+    steps = np.einsum('fni,fij->fnj', frac, cells[1:])
+    unwrapped = np.empty_like(positions)
+    unwrapped[0] = positions[0]
+    np.cumsum(steps, axis=0, out=unwrapped[1:])
+    unwrapped[1:] += positions[0]
+    return unwrapped
+
+
+def unwrap_frames(frames):
+    ''' Yield frames with positions continued from the previous frame, one frame in memory at a time
+
+    frames: iterable of Configs (e.g. History.iter_frames()), modified in place
+    '''
+    previous = None
+    for frame in frames:
+        if previous is not None:
+            frame.positions = previous + minimum_image(frame.positions - previous, frame.cell, frame.pbc)
+        previous = frame.positions
+        yield frame
@@ -0,0 +1,120 @@
+'''
+Module to calculate radial distribution functions from DLPOLY trajectories
+'''
+
+import functools
+import itertools
+import operator
+import numpy as np
+from dlpoly.config import Config
+from dlpoly.neighbours import CellList
+from dlpoly.parallel import map_frames
+from dlpoly.pbc import periodic_dims
+from dlpoly.trajectory import open_trajectory
+from dlpoly.utility import open_file
+
+
+def field_pairs(field):
+    ''' Species pairs of the Field's rdf block, or all pairs of its species if there is none '''
+    if field.get_num_pot_by_class('rdf'):
+        return [tuple(pot.atoms) for pot in field.rdfs]
+    return list(itertools.combinations_with_replacement(sorted(field.species), 2))
+
+
+def frame_histograms(frame, pairs, cutoff, nBins):
+    ''' Pair distance histograms of a frame
+
+    Returns: (nPairs, nBins+1) array of counts with the ideal number of pairs per unit volume
+    in the final column, so results of frames can be summed
+    '''
+    if not periodic_dims(frame.pbc).all():
+        raise ValueError('RDF requires a fully periodic cell, pbc is {}'.format(frame.pbc))
+    species = sorted({spec for pair in pairs for spec in pair})
+    known = {spec: ind for ind, spec in enumerate(species)}
+    speciesIDs = np.array([known.get(element, -1) for element in frame.elements], dtype=int)
+    nSpecies = np.bincount(speciesIDs[speciesIDs >= 0], minlength=len(species))
+
+    pairIDs = np.full((len(species), len(species)), -1, dtype=int)
+    ideal = np.zeros(len(pairs))
+    for ind, (first, second) in enumerate(pairs):
+        first, second = known[first], known[second]
+        pairIDs[first, second] = pairIDs[second, first] = ind
+        ideal[ind] = (nSpecies[first]*(nSpecies[first]-1)/2 if first == second
+                      else nSpecies[first]*nSpecies[second])
+
+    selected = np.flatnonzero(speciesIDs >= 0)
+    i, j, dist = CellList(frame.positions[selected], frame.cell, frame.pbc, cutoff).pairs()
+    pairID = pairIDs[speciesIDs[selected[i]], speciesIDs[selected[j]]]
+    keep = pairID >= 0
+    bins = np.minimum((dist[keep] * (nBins / cutoff)).astype(int), nBins - 1)
+    counts = np.bincount(pairID[keep]*nBins + bins, minlength=len(pairs)*nBins).reshape(len(pairs), nBins)
+    return np.column_stack((counts, ideal / abs(np.linalg.det(frame.cell))))
+
+
+class RDF():
+    ''' Radial distribution functions of species pairs accumulated over trajectory frames
+
+    source: HISTORY file, binary store (see dlpoly.trajectory) or a Config
+    pairs: sequence of species pairs, by default from field (see field_pairs) or all pairs of
+           elements in the first frame
+    nWorkers: processes to spread frames over (see dlpoly.parallel.map_frames)
+
+    After calculation, labels, r (bin centres), gofr (nPairs, nBins) and counts are available.
+    '''
+    def __init__(self, source=None, cutoff=12., binWidth=0.05, pairs=None, field=None,
+                 frames=slice(None), nWorkers=None):
+        self.cutoff = cutoff
+        self.labels = []
+        self.nFrames = 0
+        self.r = np.zeros(0)
+        self.gofr = np.zeros((0, 0))
+        self.counts = np.zeros((0, 0))
+        if source is not None:
+            self.calculate(source, cutoff, binWidth, pairs, field, frames, nWorkers)
+
+    def calculate(self, source, cutoff=12., binWidth=0.05, pairs=None, field=None,
+                  frames=slice(None), nWorkers=None):
+        ''' Accumulate pair histograms over frames '''
+        nBins = int(round(cutoff / binWidth))
+        self.cutoff = nBins * binWidth
+        if isinstance(source, Config):
+            first, self.nFrames = source, 1
+        else:
+            traj = open_trajectory(source)
+            try:
+                inds = np.atleast_1d(np.arange(traj.nFrames)[frames])
+                first, self.nFrames = traj.read_frame(int(inds[0])), len(inds)
+            finally:
+                if traj is not source:
+                    traj.close()
+        if pairs is None:
+            pairs = (field_pairs(field) if field is not None else
+                     itertools.combinations_with_replacement(sorted(set(first.elements)), 2))
+        self.labels = [tuple(pair) for pair in pairs]
+
+        histograms = functools.partial(frame_histograms, pairs=self.labels, cutoff=self.cutoff, nBins=nBins)
+        if isinstance(source, Config):
+            total = histograms(source)
+        else:
+            total = map_frames(source, histograms, operator.add, frames, nWorkers)
+        self.counts, ideal = total[:, :-1], total[:, -1]
+
+        edges = np.arange(nBins + 1) * binWidth
+        self.r = (edges[1:] + edges[:-1]) / 2
+        shells = 4./3.*np.pi*(edges[1:]**3 - edges[:-1]**3)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.gofr = np.nan_to_num(self.counts / (ideal[:, None] * shells))
+        return self
+
+    def __getitem__(self, pair):
+        pair = tuple(pair)
+        return self.gofr[self.labels.index(pair if pair in self.labels else pair[::-1])]
+
+    def write(self, filename='RDFDAT', title=''):
+        ''' Write RDFs in DLPOLY RDFDAT format '''
+        with open_file(filename, 'w') as outFile:
+            outFile.write('{0:72s}\n'.format(title))
+            outFile.write('{0:10d}{1:10d}\n'.format(len(self.labels), len(self.r)))
+            for (first, second), gofr in zip(self.labels, self.gofr):
+                outFile.write('{0:8s}{1:8s}\n'.format(first, second))
+                outFile.writelines('{0:14.6e}{1:14.6e}\n'.format(*point) for point in zip(self.r, gofr))
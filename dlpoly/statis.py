@@ -2,105 +2,440 @@
 File containing methods for loading statistics data from DL_POLY_4
 """
 
+import itertools
+import os
+import re
 import numpy as np
+from dlpoly.utility import LazyLoader, COMPRESSION, open_file, compression_of, read_appended
 
+# Short names and labels of the fixed quantities starting each STATIS record
+QUANTITIES = (("eng_tot", "Total Extended System Energy"),
+              ("temperature", "System Temperature"),
+              ("eng_cfg", "Configurational Energy"),
+              ("eng_src", "Short Range Potential Energy"),
+              ("eng_cou", "Electrostatic Energy"),
+              ("eng_bnd", "Chemical Bond Energy"),
+              ("eng_ang", "Valence Angle And 3-Body Potential Energy"),
+              ("eng_dih", "Dihedral, Inversion, And 4-Body Potential Energy"),
+              ("eng_tet", "Tethering Energy"),
+              ("enthalpy", "Enthalpy (Total Energy + Pv)"),
+              ("temp_rot", "Rotational Temperature"),
+              ("vir_tot", "Total Virial"),
+              ("vir_src", "Short-Range Virial"),
+              ("vir_cou", "Electrostatic Virial"),
+              ("vir_bnd", "Bond Virial"),
+              ("vir_ang", "Valence Angle And 3-Body Virial"),
+              ("vir_con", "Constraint Bond Virial"),
+              ("vir_tet", "Tethering Virial"),
+              ("volume", "Volume"),
+              ("temp_shl", "Core-Shell Temperature"),
+              ("eng_shl", "Core-Shell Potential Energy"),
+              ("vir_shl", "Core-Shell Virial"),
+              ("alpha", "Md Cell Angle Α"),
+              ("beta", "Md Cell Angle Β"),
+              ("gamma", "Md Cell Angle Γ"),
+              ("vir_pmf", "Pmf Constraint Virial"),
+              ("pressure", "Pressure"),
+              ("ext_dof", "External Degree Of Freedom"))
 
-class Statis():
+
+class Statis(LazyLoader):
+    """ STATIS data, read in chunks of records
+
+    lastRows: read only the final lastRows records
+    update() appends records written since the file was read """
     __version__ = "0"
+    _deferred = ('rows', 'columns', 'data', 'labels', 'header')
+    chunkRows = 16384
 
-    def __init__(self, source=None, control=None, config=None):
+    def __init__(self, source=None, control=None, config=None, lazy=False, lastRows=None):
         self.rows = 0
         self.columns = 0
         self.data = None
+        self.header = []
+        self.lastRows = lastRows
+        self._position = 0
         if source is not None:
             self.source = source
+            if lazy:
+                self.labels = []
+                self._labelSources = (control, config)
+                self.defer(source)
+                return
             self.read(source)
 
         self.gen_labels(control, config)
 
+    def load(self):
+        """ Complete any deferred read and label the columns """
+        if not self.loaded:
+            LazyLoader.load(self)
+            self.gen_labels(*self.__dict__.pop('_labelSources'))
+        return self
+
     _labelPos = property(lambda self: (len(self.labels)//5+1, len(self.labels) % 5+1))
 
     def add_label(self, arg):
         self.labels.append("{0:d}-{1:d} {2:s}".format(*self._labelPos, arg))
 
     def read(self, filename="STATIS"):
-        h1, h2, s = open(filename).read().split('\n', 2)
-        self.data = np.array(s.split(), dtype=float)
-        self.columns = int(self.data[2])
-        self.rows = self.data.size//(self.columns + 3)
-        self.data.shape = self.rows, self.columns + 3
+        """ Read complete records (the file may still be being written), lastRows if set """
+        with open_file(filename, 'rb') as fileIn:
+            header = [fileIn.readline() for _ in range(2)]
+            self.header = [line.decode().rstrip('\n') for line in header]
+            position = sum(map(len, header))
+            first = fileIn.readline()
+            if not first.endswith(b'\n'):
+                self.data, self._position = np.zeros((0, 3)), position
+                self.rows, self.columns = 0, 0
+                return self
+            recordLines = 1 + -(-int(first.split()[2]) // 5)
+            if self.lastRows and compression_of(filename) is None:
+                position = self._tail_offset(fileIn, position, first, recordLines)
+                fileIn.seek(position)
+                first = fileIn.readline()
+
+            blocks, nRows = [], 0
+            for rows, nBytes in _iter_records(fileIn, first, recordLines, self.chunkRows):
+                position += nBytes
+                blocks.append(rows)
+                nRows += len(rows)
+                # Drop blocks no longer needed for the final rows
+                while self.lastRows and nRows - len(blocks[0]) >= self.lastRows:
+                    nRows -= len(blocks.pop(0))
+
+        self.data = np.concatenate(blocks)
+        if self.lastRows:
+            self.data = self.data[-self.lastRows:]
+        self.rows, self.columns = self.data.shape[0], self.data.shape[1] - 3
+        self._position = position
         return self
 
+    def _tail_offset(self, fileIn, start, first, recordLines):
+        """ Offset of the record lastRows from the end if records have a fixed width, otherwise start """
+        recordBytes = len(first) + sum(len(fileIn.readline()) for _ in range(recordLines - 1))
+        fileIn.seek(0, 2)
+        size = fileIn.tell()
+        offset = size - (size - start) % recordBytes - self.lastRows * recordBytes
+        if offset <= start:
+            return start
+        fileIn.seek(offset - 1)
+        line = fileIn.readline()
+        if line != b'\n':
+            return start
+        line = fileIn.readline()
+        if len(line) != len(first) or line.split()[2:] != first.split()[2:]:
+            return start
+        return offset
+
+    def update(self):
+        """ Append records written since the last read or update, returning the number added """
+        self.load()
+        lines, ends = read_appended(self.source, self._position)
+        rows, used = parse_records(lines, self.columns)
+        if not used:
+            return 0
+        self._position = int(ends[used-1])
+        self.data = rows if not self.rows else np.concatenate((self.data, rows))
+        self.rows, self.columns = self.data.shape[0], self.data.shape[1] - 3
+        for i in range(len(self.labels), self.columns):
+            self.add_label("col_{:d}".format(i+1))
+        return len(rows)
+
     def gen_labels(self, control=None, config=None):
-        self.labels = ["1-1 Total Extended System Energy",
-                       "1-2 System Temperature",
-                       "1-3 Configurational Energy",
-                       "1-4 Short Range Potential Energy",
-                       "1-5 Electrostatic Energy",
-                       "2-1 Chemical Bond Energy",
-                       "2-2 Valence Angle And 3-Body Potential Energy",
-                       "2-3 Dihedral, Inversion, And 4-Body Potential Energy",
-                       "2-4 Tethering Energy",
-                       "2-5 Enthalpy (Total Energy + Pv)",
-                       "3-1 Rotational Temperature",
-                       "3-2 Total Virial",
-                       "3-3 Short-Range Virial",
-                       "3-4 Electrostatic Virial",
-                       "3-5 Bond Virial",
-                       "4-1 Valence Angle And 3-Body Virial",
-                       "4-2 Constraint Bond Virial",
-                       "4-3 Tethering Virial",
-                       "4-4 Volume",
-                       "4-5 Core-Shell Temperature",
-                       "5-1 Core-Shell Potential Energy",
-                       "5-2 Core-Shell Virial",
-                       "5-3 Md Cell Angle Α",
-                       "5-4 Md Cell Angle Β",
-                       "5-5 Md Cell Angle Γ",
-                       "6-1 Pmf Constraint Virial",
-                       "6-2 Pressure",
-                       "6-3 External Degree Of Freedom"]
+        """ Label the columns written for a run with control, and map names to columns (see __getitem__)
+
+        The mean squared displacement of each species follows the fixed quantities. Their number is
+        inferred from the columns in the file, named by the species of config if it has as many
+        (per-atom msdtemp data go to MSDTMP, not STATIS) """
+        self.labels = []
+        self._columns = {}
+        for key, label in QUANTITIES:
+            self._columns[key] = len(self.labels) + 3
+            self.add_label(label)
 
         if control:
-            # Never true as yet
-            if getattr(control, 'l_msd', False) and config:
-                for i in range(config.natoms):
-                    self.add_label("Mean Squared Displacement")
-                    self.add_label("Velocity . Velocity")
-            for i in range(9):
-                self.add_label("Stress Tensor")
-            if control and control.ensemble.ensemble in ("npt", "nst"):
-                for i in range(9):
-                    self.add_label("Cell Dimensions")
-                self.add_label("Instantaneous PV")
+            extras = []
+            if control.ensemble.ensemble in ("npt", "nst"):
+                extras += [("cell", "Cell Dimensions", 9), ("pv", "Instantaneous PV", 1)]
                 if any(key in control.ensemble.args for key in ("area", "tens", "semi", "orth")):
-                    self.add_label("H_Z")
-                    self.add_label("vol/h_z")
+                    extras += [("h_z", "H_Z", 1), ("vol_h_z", "vol/h_z", 1)]
                     if any(key in control.ensemble.args for key in ("tens", "semi")):
                         # "-h_z*(stats%strtot(1)-(thermo%press+thermo%stress(1)))*tenunt"
-                        self.add_label("Surface Tension")
                         # "-h_z*(stats%strtot(5)-(thermo%press+thermo%stress(5)))*tenunt"
-                        self.add_label("Surface Tension")
+                        extras += [("tension", "Surface Tension", 2)]
+
+            nSpecies = self.columns - len(QUANTITIES) - 9 - sum(width for *_, width in extras)
+            species = [""] * max(0, nSpecies)
+            if config is not None:
+                _, first = np.unique(config.elements, return_index=True)
+                # Trust the columns actually written if config does not match them
+                if not self.columns or len(first) == nSpecies:
+                    species = list(config.elements[np.sort(first)])
+            self._add_group("amsd", ["Mean Squared Displacement {}".format(spec).rstrip() for spec in species])
+            self._add_group("stress", ["Stress Tensor"] * 9)
+            for key, label, width in extras:
+                self._add_group(key, [label] * width)
 
         # Catch Remainder
-        for i in range(len(self.labels)+1, self.columns):
-            self.add_label("col_{2:d}".format(i+1))
+        for i in range(len(self.labels), self.columns):
+            self.add_label("col_{:d}".format(i+1))
+
+    def _add_group(self, key, labels):
+        start = len(self.labels) + 3
+        for label in labels:
+            self.add_label(label)
+        self._columns[key] = slice(start, len(self.labels) + 3) if len(labels) != 1 else start
+
+    def __getitem__(self, key):
+        """ View of the data of a quantity by name (see QUANTITIES, and amsd, stress, cell, pv, h_z,
+        vol_h_z and tension where written) or by label
+
+        Grouped quantities such as stress give (rows, n) views, others (rows,) """
+        self.load()
+        if key in self._columns:
+            column = self._columns[key]
+        elif key in self.labels:
+            column = self.labels.index(key) + 3
+        else:
+            raise KeyError("No STATIS quantity {}".format(key))
+        return self.data[:, column]
+
+    def __contains__(self, key):
+        self.load()
+        return key in self._columns or key in self.labels
+
+    def keys(self):
+        """ Names of the quantities available by name """
+        self.load()
+        return [key for key, column in self._columns.items()
+                if (column.start if isinstance(column, slice) else column) < self.columns + 3]
+
+    step = property(lambda self: self.data[:, 0])
+    time = property(lambda self: self.data[:, 1])
+    values = property(lambda self: self.data[:, 3:])
+
+    def flatten(self, directory="."):
+        """ Write the time and value of each column to a file per column in directory """
+        self.export(directory, fileFormat="columns")
+
+    def _select(self, columns=None):
+        """ Data column indices and labels of quantities by name or label (default all columns) """
+        if columns is None:
+            return list(range(3, self.columns + 3)), self.labels[:self.columns]
+        if isinstance(columns, str):
+            columns = [columns]
+        inds = []
+        for key in columns:
+            if key in self._columns:
+                column = self._columns[key]
+            elif key in self.labels:
+                column = self.labels.index(key) + 3
+            else:
+                raise KeyError("No STATIS quantity {}".format(key))
+            inds += list(range(self.columns + 3)[column]) if isinstance(column, slice) else [column]
+        return inds, [self.labels[ind - 3] for ind in inds]
+
+    def export(self, filename, columns=None, fileFormat=None, stride=1, timeRange=None, precision=6):
+        """ Write the step, time and selected columns of rows in one pass
+
+        columns: names or labels of quantities (see __getitem__), by default all columns
+        fileFormat: "csv", "tsv", "npy", "npz" (arrays keyed by sanitised label) or "columns"
+                    (a file of time and value per column, named by sanitised label, in directory
+                    filename), by default from the extension of filename
+        stride: write every stride-th row
+        timeRange: (start, end) times of rows to write, either may be None
+        """
+        self.load()
+        if fileFormat is None:
+            base, ext = os.path.splitext(filename)
+            if ext.lstrip(".") in COMPRESSION:
+                base, ext = os.path.splitext(base)
+            fileFormat = ext.lstrip(".") or "columns"
+        if fileFormat not in ("csv", "tsv", "npy", "npz", "columns"):
+            raise ValueError("Cannot export STATIS to format {}".format(fileFormat))
+        inds, labels = self._select(columns)
+        start, end = timeRange if timeRange is not None else (None, None)
+        rows = slice(None if start is None else np.searchsorted(self.time, start, side="left"),
+                     None if end is None else np.searchsorted(self.time, end, side="right"), stride)
+        table = self.data[rows][:, [0, 1] + inds]
+
+        if fileFormat == "npy":
+            np.save(filename, table)
+        elif fileFormat == "npz":
+            np.savez(filename, step=table[:, 0], time=table[:, 1],
+                     **{sanitise_label(label): table[:, i+2] for i, label in enumerate(labels)})
+        elif fileFormat == "columns":
+            os.makedirs(filename, exist_ok=True)
+            for i, label in enumerate(labels):
+                write_table(os.path.join(filename, sanitise_label(label)), table[:, [1, i+2]],
+                            precision=precision)
+        else:
+            delimiter = "," if fileFormat == "csv" else "\t"
+            header = delimiter.join('"{}"'.format(name) if delimiter in name else name
+                                    for name in ["step", "time"] + labels)
+            write_table(filename, table, header, delimiter, precision, integerColumns=1)
+        return filename
+
+    def write(self, filename="STATIS"):
+        """ Write the header and records in STATIS format """
+        self.load()
+        with open_file(filename, "w") as outFile:
+            outFile.writelines(line + "\n" for line in self.header or ["", ""])
+            outFile.writelines(format_rows(self.data, record_format(self.columns)))
+        return filename
+
+    @classmethod
+    def concat(cls, sources, filename=None, control=None, config=None, chunkRows=16384):
+        """ Merge STATIS files, e.g. of restart segments, into one series ordered by step
+
+        Where steps are repeated the record from the latest source (and latest in that source)
+        is kept. Sources are streamed in chunks: once to find the records kept, then to copy
+        them into a contiguous array or, if filename is given, directly into a new STATIS file
+        (returning it as a lazy Statis). The header is taken from the first source.
+        """
+        sources = list(sources)
+        if not sources:
+            raise ValueError("No STATIS files to merge")
+        steps, columns = [], None
+        for source in sources:
+            srcSteps = [np.zeros(0)]
+            for rows in iter_chunks(source, chunkRows):
+                if columns is None:
+                    columns = rows.shape[1] - 3
+                elif rows.shape[1] - 3 != columns:
+                    raise ValueError("STATIS {} has {} columns, expected {}".format(
+                        source, rows.shape[1] - 3, columns))
+                srcSteps.append(rows[:, 0])
+            steps.append(np.concatenate(srcSteps))
+
+        # Output row of the last occurrence of each step, -1 for records replaced
+        allSteps = np.concatenate(steps)
+        _, lastRev = np.unique(allSteps[::-1], return_index=True)
+        kept = len(allSteps) - 1 - lastRev
+        positions = np.full(len(allSteps), -1)
+        positions[kept] = np.arange(len(kept))
+        positions = np.split(positions, np.cumsum([len(srcSteps) for srcSteps in steps])[:-1])
+        with open_file(sources[0], "rb") as fileIn:
+            header = [fileIn.readline().decode().rstrip("\n") for _ in range(2)]
+
+        # Kept records in source order are already in step order, e.g. for successive restarts
+        streamed = filename is not None and np.all(np.diff(kept) > 0)
+        if streamed:
+            outFile = open_file(filename, "w")
+            outFile.writelines(line + "\n" for line in header)
+        else:
+            data = np.zeros((len(kept), (columns or 0) + 3))
+        try:
+            for source, srcPositions in zip(sources, positions):
+                start = 0
+                for rows in iter_chunks(source, chunkRows):
+                    chunkPositions = srcPositions[start:start + len(rows)]
+                    start += len(rows)
+                    keep = chunkPositions >= 0
+                    if streamed:
+                        outFile.writelines(format_rows(rows[keep], record_format(columns)))
+                    else:
+                        data[chunkPositions[keep]] = rows[keep]
+        finally:
+            if streamed:
+                outFile.close()
+
+        if streamed:
+            return cls(filename, control, config, lazy=True)
+        statis = cls()
+        statis.header, statis.data = header, data
+        statis.rows, statis.columns = len(data), data.shape[1] - 3
+        statis.gen_labels(control, config)
+        if filename is not None:
+            statis.write(filename)
+        return statis
+
+
+def sanitise_label(label):
+    """ Label as a file or variable name, e.g. "1-2 System Temperature" as "1-2_System_Temperature" """
+    return re.sub(r"[^\w.+-]+", "_", label, flags=re.ASCII).strip("_")
+
+
+def format_rows(table, fmt, chunkRows=65536):
+    """ Yield text of chunks of rows of a 2D array, formatting each chunk in a single operation """
+    for start in range(0, len(table), chunkRows):
+        chunk = table[start:start + chunkRows]
+        yield (fmt * len(chunk)) % tuple(chunk.ravel())
+
+
+def write_table(filename, table, header=None, delimiter=" ", precision=6, integerColumns=0):
+    """ Write rows of a 2D array as delimited text """
+    nColumns = table.shape[1]
+    fmt = delimiter.join(["%d"] * integerColumns + ["%.{}e".format(precision)] * (nColumns - integerColumns))
+    with open_file(filename, "w") as outFile:
+        if header is not None:
+            outFile.write(header + "\n")
+        outFile.writelines(format_rows(table, fmt + "\n"))
+
+
+def record_format(columns):
+    """ Format of a STATIS record of columns values: nstep, time and ncols then values five per line """
+    values = ["%14.6E"] * columns
+    return "%10d%14.6E%10d\n" + "".join("".join(values[i:i+5]) + "\n" for i in range(0, columns, 5))
+
+
+def _iter_records(fileIn, first, recordLines, chunkRows):
+    """ Yield chunks of complete records read from a binary STATIS stream after the line first,
+    as arrays and the number of bytes they take """
+    lines = [first] + list(itertools.islice(fileIn, chunkRows * recordLines - 1))
+    while lines:
+        if not lines[-1].endswith(b'\n'):
+            lines.pop()
+            if not lines:  # Chunk starts with the record being written
+                break
+        rows, used = parse_records([line.decode() for line in lines])
+        yield rows, sum(map(len, lines[:used]))
+        if used < len(lines):  # Incomplete final record
+            break
+        lines = list(itertools.islice(fileIn, chunkRows * recordLines))
+
+
+def iter_chunks(filename="STATIS", chunkRows=16384):
+    """ Yield successive arrays of at most chunkRows complete records of a STATIS file """
+    with open_file(filename, 'rb') as fileIn:
+        for _ in range(2):
+            fileIn.readline()
+        first = fileIn.readline()
+        if first.endswith(b'\n'):
+            recordLines = 1 + -(-int(first.split()[2]) // 5)
+            for rows, _ in _iter_records(fileIn, first, recordLines, chunkRows):
+                yield rows
+
+
+def parse_records(lines, columns=0):
+    """ Parse STATIS records (nstep, time, ncols and ncols values) from lines following the header
 
-    def flatten(self):
-        for i in range(self.columns-3):
-            with open(self.labels[i], 'w') as f:
-                for j in range(self.rows):
-                    f.write("{} {}\n".format(self.data[j, 1], self.data[j, i+3]))
+    Returns the rows as an (nRows, ncols+3) array and the number of lines used, leaving
+    any trailing incomplete record unparsed. columns sets the width of an empty result """
+    if not lines or not lines[0].strip():
+        return np.zeros((0, columns + 3)), 0
+    columns = int(lines[0].split()[2])
+    recordLines = 1 + -(-columns // 5)
+    nRows = len(lines) // recordLines
+    used = nRows * recordLines
+    data = np.fromstring(' '.join(lines[:used]), sep=' ')
+    if data.size != nRows * (columns + 3):
+        raise ValueError('Malformed STATIS records')
+    data.shape = nRows, columns + 3
+    if np.any(data[:, 2] != columns):
+        raise ValueError('Number of STATIS columns changes between records')
+    return data, used
 
 
 def read_rdf(filename="RDFDAT"):
     """ Read an RDF file into data """
-    with open(filename, 'r') as fileIn:
+    with open_file(filename, 'r') as fileIn:
         # Discard title
         _ = fileIn.readline()
         nRDF, nPoints = map(int, fileIn.readline().split())
 
-        data = np.zeros(nRDF+1, nPoints, 2)
+        data = np.zeros((nRDF+1, nPoints, 2))
         labels = []
 
         for sample in range(nRDF):
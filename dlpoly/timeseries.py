@@ -0,0 +1,210 @@
+'''
+Module providing statistical analysis of time series, e.g. the columns of a STATIS file
+
+Functions act on arrays with time along the first axis and analyse every other column at once.
+'''
+
+import numpy as np
+from dlpoly.correlation import correlate, _fft_length
+
+# Working memory for FFTs of many long series at once
+maxBytes = 1 << 28
+
+
+def _series(data):
+    data = np.asarray(data, dtype=float)
+    if len(data) < 2:
+        raise ValueError('Time series of {} points is too short to analyse'.format(len(data)))
+    return data
+
+
+def _pick(values, level):
+    ''' Value of each series at its own index along the first axis '''
+    flat = values.reshape(len(values), -1)
+    return flat[np.ravel(level), np.arange(flat.shape[1])].reshape(values.shape[1:])[()]
+
+
+def block_averages(data, nBlocks=10):
+    ''' Means of nBlocks contiguous blocks along the time axis, discarding remainder points at the start
+
+    Returns: block means (nBlocks, ...) and the standard error of the mean estimated from them
+    '''
+    data = _series(data)
+    blockSize = len(data) // nBlocks
+    if not blockSize:
+        raise ValueError('Cannot divide {} points into {} blocks'.format(len(data), nBlocks))
+    blocks = data[len(data) - nBlocks*blockSize:].reshape((nBlocks, blockSize) + data.shape[1:]).mean(axis=1)
+    return blocks, blocks.std(axis=0, ddof=1) / np.sqrt(nBlocks)
+
+
+def blocking(data):
+    ''' Flyvbjerg-Petersen blocking of series, successively averaging neighbouring pairs of points
+
+    Returns: block sizes (nLevels,), standard error of the mean (nLevels, ...) estimated at each
+    level and its uncertainty (nLevels, ...). The error grows with block size until blocks are
+    uncorrelated, where it plateaus (see blocking_error).
+    '''
+    data = _series(data)
+    sizes, errors, errorErrors = [], [], []
+    size = 1
+    while len(data) >= 2:
+        nPoints = len(data)
+        error = np.sqrt(data.var(axis=0) / (nPoints - 1))
+        sizes.append(size)
+        errors.append(error)
+        errorErrors.append(error / np.sqrt(2.*(nPoints - 1)))
+        data = (data[:nPoints//2*2:2] + data[1:nPoints//2*2:2]) / 2
+        size *= 2
+    return np.array(sizes), np.array(errors), np.array(errorErrors)
+
+
+def blocking_error(data, minBlocks=16):
+    ''' Standard error of the mean of series from the plateau of Flyvbjerg-Petersen blocking
+
+    The plateau is taken as the first level whose error is not exceeded at the next block size
+    by more than its uncertainty, considering only levels of at least minBlocks blocks (the
+    largest error of those if none plateaus).
+    '''
+    sizes, errors, errorErrors = blocking(data)
+    nLevels = max(1, np.count_nonzero(len(data) // sizes >= minBlocks))
+    errors, errorErrors = errors[:nLevels], errorErrors[:nLevels]
+    if nLevels == 1:
+        return errors[0]
+    converged = np.diff(errors, axis=0) <= errorErrors[:-1]
+    level = np.where(converged.any(axis=0), converged.argmax(axis=0), errors.argmax(axis=0))
+    return _pick(errors, level)
+
+
+def autocorrelation(data):
+    ''' Normalised autocorrelation function of each series about its mean, by FFT in chunks of columns
+
+    Constant series, which have no defined autocorrelation, give 1 at zero lag and 0 elsewhere
+    '''
+    data = _series(data)
+    flat = data.reshape(len(data), -1)
+    acf = np.zeros(flat.shape)
+    chunk = max(1, maxBytes // (_fft_length(len(flat)) * 8 * 4))
+    for start in range(0, flat.shape[1], chunk):
+        cols = slice(start, start + chunk)
+        corr = correlate(flat[:, cols] - flat[:, cols].mean(axis=0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            acf[:, cols] = corr / corr[0]
+    constant = ~np.isfinite(acf[0])
+    acf[:, constant] = 0.
+    acf[0, constant] = 1.
+    return acf.reshape(data.shape)
+
+
+def _integrated_time(acf, window):
+    tau = np.cumsum(acf, axis=0) - 0.5
+    lags = np.arange(len(acf)).reshape((-1,) + (1,)*(acf.ndim-1))
+    stop = lags >= window * tau
+    return _pick(tau, np.where(stop.any(axis=0), stop.argmax(axis=0), len(acf) - 1))
+
+
+def _inefficiency(acf):
+    nTimes = len(acf)
+    weights = (1. - np.arange(1, nTimes) / nTimes).reshape((-1,) + (1,)*(acf.ndim-1))
+    positive = np.cumprod(acf[1:] > 0., axis=0, dtype=bool)
+    return np.maximum(1., 1. + 2.*np.sum(weights * acf[1:] * positive, axis=0))
+
+
+def integrated_autocorrelation_time(data, window=5.):
+    ''' Integrated autocorrelation time 1/2 + sum_t rho(t) of each series in units of the sampling interval
+
+    The sum is truncated at the first lag M >= window * tau(M) (Sokal's automatic windowing),
+    balancing the bias of a short sum against the noise of long lags.
+    '''
+    return _integrated_time(autocorrelation(data), window)
+
+
+def statistical_inefficiency(data):
+    ''' Statistical inefficiency g = 1 + 2 sum_t (1 - t/T) rho(t) of each series
+
+    The sum is truncated where the autocorrelation first falls to zero. T/g is the number of
+    effectively independent samples, so the standard error of the mean is sqrt(g var / T).
+    '''
+    return _inefficiency(autocorrelation(data))
+
+
+def detect_equilibration(data, nCandidates=50, maxPoints=1 << 14):
+    ''' Start of the equilibrated region of each series, maximising the effective number of samples
+
+    The statistical inefficiency g of data[t0:] is evaluated for nCandidates evenly spaced
+    starts t0 in the first half of the series, choosing the t0 with the most independent
+    samples (T - t0)/g (Chodera, J. Chem. Theory Comput. 12, 1799 (2016)).
+    Series longer than maxPoints are first averaged over blocks of rows, with g in rows found
+    from the variance of the block means, so each candidate costs O(maxPoints log maxPoints).
+    Returns: starts, statistical inefficiencies and effective numbers of samples of each series
+    '''
+    data = _series(data)
+    blockSize = -(-len(data) // maxPoints)
+    nBlocks = len(data) // blockSize
+    blocks = data[:nBlocks*blockSize].reshape((nBlocks, blockSize) + data.shape[1:])
+    # Sums of values and squares over the blocks from each block to the end
+    sums, squares = (np.cumsum(vals[::-1], axis=0)[::-1] for vals in (blocks.sum(axis=1), (blocks**2).sum(axis=1)))
+    blocks = blocks.mean(axis=1)
+
+    candidates = np.unique(np.linspace(0, nBlocks // 2, nCandidates).astype(int))
+    inefficiency = []
+    for start in candidates:
+        nRows = (nBlocks - start) * blockSize
+        variance = squares[start] / nRows - (sums[start] / nRows)**2
+        blockVariance = blocks[start:].var(axis=0) * _inefficiency(autocorrelation(blocks[start:]))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = blockSize * blockVariance / variance
+        # Constant series are uncorrelated
+        inefficiency.append(np.where(ratio > 1., ratio, 1.))
+    inefficiency = np.array(inefficiency)
+    effective = ((nBlocks - candidates) * blockSize).reshape((-1,) + (1,)*(data.ndim-1)) / inefficiency
+    best = effective.argmax(axis=0)
+    return candidates[best] * blockSize, _pick(inefficiency, best), _pick(effective, best)
+
+
+class TimeSeries():
+    ''' Statistics of every column of a Statis (or array of series with time along the first axis)
+
+    equilibrate: discard the start of each series found by detect_equilibration, otherwise use
+                 all of it
+    window: Sokal window of the integrated autocorrelation time
+
+    After analysis, labels, start (first equilibrated row), mean, stderr (from blocking),
+    inefficiency and tau (integrated autocorrelation time in rows) are available per column.
+    '''
+    def __init__(self, source=None, equilibrate=True, nCandidates=50, window=5.):
+        self.labels = []
+        self.start = np.zeros(0, dtype=int)
+        self.mean = self.stderr = self.inefficiency = self.tau = np.zeros(0)
+        if source is not None:
+            self.analyse(source, equilibrate, nCandidates, window)
+
+    def analyse(self, source, equilibrate=True, nCandidates=50, window=5.):
+        ''' Analyse each column of source '''
+        if hasattr(source, 'values'):
+            data, self.labels = source.values, list(source.labels)
+        else:
+            data = np.asarray(source, dtype=float).reshape(len(source), -1)
+            self.labels = list(range(data.shape[1]))
+        nColumns = data.shape[1]
+
+        if equilibrate:
+            self.start, self.inefficiency, _ = detect_equilibration(data, nCandidates)
+        else:
+            self.start, self.inefficiency = np.zeros(nColumns, dtype=int), np.zeros(nColumns)
+        self.mean, self.stderr, self.tau = np.zeros((3, nColumns))
+        # Columns sharing a start are analysed together
+        for start in np.unique(self.start):
+            cols = np.flatnonzero(self.start == start)
+            series = data[start:, cols]
+            acf = autocorrelation(series)
+            self.mean[cols] = series.mean(axis=0)
+            self.stderr[cols] = blocking_error(series)
+            self.tau[cols] = _integrated_time(acf, window)
+            if not equilibrate:
+                self.inefficiency[cols] = _inefficiency(acf)
+        return self
+
+    def __getitem__(self, label):
+        ''' Dict of the statistics of a column '''
+        ind = self.labels.index(label)
+        return {key: getattr(self, key)[ind] for key in ('start', 'mean', 'stderr', 'inefficiency', 'tau')}
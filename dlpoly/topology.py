@@ -0,0 +1,144 @@
+'''
+Module building system-wide molecular topology from a DLPOLY Field
+'''
+
+import numpy as np
+from dlpoly.pbc import minimum_image
+
+# Bonded classes which hold a molecule together
+CONNECTING = ('bonds', 'constraints', 'rigid', 'shell')
+
+
+def _bond_pairs(pot):
+    ''' Site pairs (from 0) linking the atoms of a bonded term, rigid units as a star '''
+    sites = [int(atom) - 1 for atom in pot.atoms]
+    return [(sites[0], other) for other in sites[1:]]
+
+
+class Topology():
+    ''' Connectivity of every atom in a system built from a Field, in CONFIG order
+
+    molecule, species, masses, charges: molecule index, species name, mass and charge of each atom
+    bonds: (nBonds, 2) array of bonded atom indices (from 0) from bonds, constraints, rigid
+           units and core-shell units
+
+    Per-molecule reductions act on (..., natoms, ...) arrays of a configuration or a stack of
+    frames, summing the contiguous atoms of each molecule with np.add.reduceat.
+    '''
+    def __init__(self, field=None):
+        self.natoms = 0
+        self.moleculeNames = []
+        self.molecule = np.zeros(0, dtype=int)
+        self.species = np.zeros(0, dtype=str)
+        self.masses = np.zeros(0)
+        self.charges = np.zeros(0)
+        self.bonds = np.zeros((0, 2), dtype=int)
+        self._levels = None
+        if field is not None:
+            self.build(field)
+
+    nMolecules = property(lambda self: len(self.moleculeNames))
+    # Index of the first atom of each molecule
+    starts = property(lambda self: np.flatnonzero(np.diff(self.molecule, prepend=-1)))
+
+    def build(self, field):
+        ''' Expand each molecule type by its number of molecules '''
+        names, bonds, sites = [], [], []
+        start = 0
+        for mol in field.molecules.values():
+            nAtoms = mol.nAtoms
+            sites.append(([site for site in mol.sites for _ in range(site.repeats)], mol.nMols))
+            local = np.asarray([pair for potClass in CONNECTING if mol.get_num_pot_by_class(potClass)
+                                for pot in mol.get_pot_by_class(potClass) for pair in _bond_pairs(pot)],
+                               dtype=int).reshape(-1, 2)
+            offsets = start + nAtoms * np.arange(mol.nMols)
+            bonds.append((local[None, :, :] + offsets[:, None, None]).reshape(-1, 2))
+            names += [mol.name] * mol.nMols
+            start += nAtoms * mol.nMols
+
+        self.natoms = start
+        self.moleculeNames = names
+        self.molecule = np.repeat(np.arange(len(names)),
+                                  [mol.nAtoms for mol in field.molecules.values() for _ in range(mol.nMols)])
+        self.bonds = np.concatenate(bonds) if bonds else np.zeros((0, 2), dtype=int)
+        self.species = np.concatenate([np.tile([site.element for site in molSites], nMols)
+                                       for molSites, nMols in sites] or [np.zeros(0, dtype=str)])
+        self.masses, self.charges = (np.concatenate([np.tile([getattr(site, key) for site in molSites], nMols)
+                                                     for molSites, nMols in sites] or [np.zeros(0)])
+                                     for key in ('mass', 'charge'))
+        self._levels = None
+        return self
+
+    def molecule_sum(self, values, axis=-2):
+        ''' Sum per-atom values over each molecule along the atom axis, e.g. -2 for (..., natoms, 3) vectors '''
+        return np.add.reduceat(np.asarray(values), self.starts, axis=axis)
+
+    def molecule_masses(self):
+        ''' Total mass of each molecule '''
+        return self.molecule_sum(self.masses, axis=-1)
+
+    def _whole(self, positions, cell, pbc):
+        positions = np.asarray(positions, dtype=float)
+        return positions if cell is None else self.make_whole(positions, cell, pbc)
+
+    def centres_of_mass(self, positions, cell=None, pbc=0):
+        ''' Centre of mass of each molecule (..., nMolecules, 3), made whole first if cell is given '''
+        positions = self._whole(positions, cell, pbc)
+        return self.molecule_sum(self.masses[:, None] * positions) / self.molecule_masses()[:, None]
+
+    def dipoles(self, positions, cell=None, pbc=0):
+        ''' Dipole moment of each molecule about its centre of mass (..., nMolecules, 3) '''
+        positions = self._whole(positions, cell, pbc)
+        relative = positions - self.centres_of_mass(positions)[..., self.molecule, :]
+        return self.molecule_sum(self.charges[:, None] * relative)
+
+    def inertia_tensors(self, positions, cell=None, pbc=0):
+        ''' Inertia tensor of each molecule about its centre of mass (..., nMolecules, 3, 3) '''
+        positions = self._whole(positions, cell, pbc)
+        relative = positions - self.centres_of_mass(positions)[..., self.molecule, :]
+        weighted = self.masses[:, None] * relative
+        outer = np.einsum('...i,...j->...ij', weighted, relative)
+        square = np.einsum('...ii->...', outer)
+        return self.molecule_sum(square[..., None, None] * np.eye(3) - outer, axis=-3)
+
+    def _spanning_levels(self):
+        ''' Spanning forest of bonds as (child, parent) arrays per depth from the first atom of each
+        molecule, or of each bonded fragment within it '''
+        if self._levels is not None:
+            return self._levels
+        # Make edges symmetric so either end can be reached first
+        edges = np.concatenate((self.bonds, self.bonds[:, ::-1]))
+        visited = np.zeros(self.natoms, dtype=bool)
+        visited[np.flatnonzero(np.diff(self.molecule, prepend=-1))] = True
+        self._levels = []
+        while True:
+            frontier = edges[visited[edges[:, 1]] & ~visited[edges[:, 0]]]
+            if not len(frontier):
+                unvisited = np.flatnonzero(~visited)
+                if not len(unvisited):
+                    break
+                # Fragments not bonded to the rest of their molecule start from their first atom
+                _, first = np.unique(self.molecule[unvisited], return_index=True)
+                visited[unvisited[first]] = True
+                continue
+            children, first = np.unique(frontier[:, 0], return_index=True)
+            self._levels.append((children, frontier[first, 1]))
+            visited[children] = True
+        return self._levels
+
+    def make_whole(self, positions, cell, pbc):
+        ''' Positions with every molecule unbroken across periodic boundaries
+
+        positions: (..., natoms, 3) array, e.g. a single configuration or a stack of frames
+                   (with a matching (nFrames, 3, 3) stack of cells)
+        Each bonded atom is placed at the minimum image of its neighbour nearer the first
+        atom of its molecule, one layer of the bond tree at a time.
+        '''
+        positions = np.array(positions, dtype=float)
+        if positions.shape[-2] != self.natoms:
+            raise ValueError('Topology of {} atoms does not match {} positions'.format(
+                self.natoms, positions.shape[-2]))
+        for children, parents in self._spanning_levels():
+            sep = minimum_image(positions[..., children, :] - positions[..., parents, :], cell, pbc)
+            positions[..., children, :] = positions[..., parents, :] + sep
+        return positions
@@ -0,0 +1,221 @@
+'''
+Module to convert DLPOLY HISTORY files to a binary trajectory store and read them back
+
+A store is a directory holding one .npy array of shape (nFrames, natoms, 3) for each of
+positions (and velocities, forces depending on level) and meta.npz with the vectors stored,
+the per-frame step, time and cell and per-atom element, index, mass and charge.
+'''
+
+import argparse as arg
+import contextlib
+import os
+import os.path
+import tempfile
+import numpy as np
+from numpy.lib.format import open_memmap
+from dlpoly.history import History, Frame
+
+VECTORS = ('positions', 'velocities', 'forces')
+
+
+def convert_history(source, dest, dtype=np.float32, blockFrames=64, frames=slice(None), keys=None):
+    ''' Convert HISTORY source (a file or open History) to a binary store in directory dest,
+    blockFrames frames at a time
+
+    frames: frames of source to convert (default all)
+    keys: vectors to convert (default all those of the trajectory's level)
+    All frames must have the same number of atoms and level.
+    '''
+    dtype = np.dtype(dtype)
+    hist = source if isinstance(source, History) else History(source)
+    try:
+        inds = np.atleast_1d(np.arange(hist.nFrames)[frames])
+        if not len(inds):
+            raise ValueError('No complete frames in {}'.format(hist.source))
+        if np.any(hist.natoms[inds] != hist.natoms[inds[0]]) or np.any(hist.levels[inds] != hist.levels[inds[0]]):
+            raise ValueError('Cannot convert {}: number of atoms or level changes between frames'.format(
+                hist.source))
+        natoms, level = int(hist.natoms[inds[0]]), int(hist.levels[inds[0]])
+        shape = (len(inds), natoms, 3)
+
+        keys = VECTORS[:level+1] if keys is None else tuple(keys)
+        os.makedirs(dest, exist_ok=True)
+        # Remove vectors of any earlier conversion into dest
+        for key in VECTORS:
+            path = os.path.join(dest, key + '.npy')
+            if key not in keys and os.path.isfile(path):
+                os.remove(path)
+        arrays = {key: open_memmap(os.path.join(dest, key + '.npy'), mode='w+', dtype=dtype, shape=shape)
+                  for key in keys}
+        for start in range(0, len(inds), blockFrames):
+            for i, ind in enumerate(inds[start:start + blockFrames], start):
+                frame = hist.read_frame(int(ind))
+                if not i:
+                    first = frame
+                for key, array in arrays.items():
+                    array[i] = getattr(frame, key)
+            for array in arrays.values():
+                array.flush()
+
+        np.savez(os.path.join(dest, 'meta.npz'), title=hist.title, natoms=natoms, level=level,
+                 keys=np.array(keys, dtype=str), pbc=hist.pbcs[inds[0]],
+                 steps=hist.steps[inds], times=hist.times[inds], cells=hist.cells[inds],
+                 elements=first.elements, indices=first.indices, masses=first.masses, charges=first.charges)
+        arrays.clear()  # Release maps before reopening read-only
+    finally:
+        if hist is not source:
+            hist.close()
+    return BinaryTrajectory(dest)
+
+
+class BinaryTrajectory():
+    ''' Memory-mapped binary trajectory store written by convert_history
+
+    positions, velocities and forces are read-only (nFrames, natoms, 3) memmaps;
+    indexing returns a Frame whose arrays are views into them.
+    '''
+    def __init__(self, source):
+        self.source = source
+        with np.load(os.path.join(source, 'meta.npz')) as meta:
+            self.title = str(meta['title'])
+            self.natoms = int(meta['natoms'])
+            self.level = int(meta['level'])
+            self.pbc = int(meta['pbc'])
+            self.steps, self.times, self.cells = meta['steps'], meta['times'], meta['cells']
+            self.elements, self.indices = meta['elements'], meta['indices']
+            self.masses, self.charges = meta['masses'], meta['charges']
+            keys = list(meta['keys']) if 'keys' in meta.files else VECTORS[:self.level+1]
+        for key in VECTORS:
+            path = os.path.join(source, key + '.npy')
+            setattr(self, key, np.load(path, mmap_mode='r') if key in keys else None)
+
+    nFrames = property(lambda self: len(self.steps))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.nFrames
+
+    def __getitem__(self, ind):
+        if isinstance(ind, slice):
+            return [self.frame(i) for i in range(*ind.indices(self.nFrames))]
+        if ind < 0:
+            ind += self.nFrames
+        if not 0 <= ind < self.nFrames:
+            raise IndexError('Frame {} out of range'.format(ind))
+        return self.frame(ind)
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    def close(self):
+        ''' Release the maps '''
+        self.positions = self.velocities = self.forces = None
+
+    def iter_frames(self, start=0, stop=None, step=1):
+        ''' Yield frames start:stop:step '''
+        for ind in range(*slice(start, stop, step).indices(self.nFrames)):
+            yield self.frame(ind)
+
+    def frame(self, ind):
+        ''' Frame ind with arrays viewing the store (read-only) '''
+        frame = Frame()
+        frame.title, frame.level, frame.pbc = self.title, self.level, self.pbc
+        frame.cell = self.cells[ind]
+        frame.step, frame.time = int(self.steps[ind]), float(self.times[ind])
+        frame.elements, frame.indices = self.elements, self.indices
+        frame.masses, frame.charges = self.masses, self.charges
+        for key in VECTORS:
+            if getattr(self, key) is not None:
+                setattr(frame, key, getattr(self, key)[ind])
+        return frame
+
+    read_frame = frame
+
+
+def open_trajectory(source):
+    ''' Open source as a BinaryTrajectory if it is a store directory, otherwise as a HISTORY file '''
+    if isinstance(source, (History, BinaryTrajectory)):
+        return source
+    return BinaryTrajectory(source) if os.path.isdir(source) else History(source)
+
+
+@contextlib.contextmanager
+def atom_chunked(source, key='positions', frames=slice(None), chunkAtoms=None, maxBytes=1 << 28):
+    ''' Open source for reading key (positions, velocities or forces) of selected frames in chunks of atoms
+
+    chunkAtoms: atoms per chunk (default: sized so a chunk of all frames takes maxBytes/8, leaving
+                room for working arrays)
+    A HISTORY file needing more than one chunk is first streamed once into a temporary binary
+    store (double precision, in the system temporary directory), so each chunk of atoms reads
+    the store rather than reparsing every frame.
+    Yields: trajectory, indices of the selected frames in it, first selected frame and chunkAtoms
+    '''
+    traj = open_trajectory(source)
+    tmpDir = None
+    try:
+        inds = np.atleast_1d(np.arange(traj.nFrames)[frames])
+        first = traj.read_frame(int(inds[0]))
+        if first.level < VECTORS.index(key):
+            raise ValueError('{} require a trajectory of level {} or more, level is {}'.format(
+                key.capitalize(), VECTORS.index(key), first.level))
+        if chunkAtoms is None:
+            chunkAtoms = max(1, maxBytes // (len(inds) * 3 * 8 * 8))
+        if isinstance(traj, History) and chunkAtoms < first.natoms:
+            tmpDir = tempfile.TemporaryDirectory()
+            store = convert_history(traj, tmpDir.name, dtype=np.float64, frames=inds, keys=(key,))
+            if traj is not source:
+                traj.close()
+            traj, inds = store, np.arange(len(inds))
+        yield traj, inds, first, chunkAtoms
+    finally:
+        if traj is not source:
+            traj.close()
+        if tmpDir is not None:
+            tmpDir.cleanup()
+
+
+def trajectory_array(traj, key='positions', frames=slice(None), atoms=slice(None)):
+    ''' Array (nFrames, nAtoms, 3) of key (positions, velocities or forces) for selected frames and atoms '''
+    frames = np.atleast_1d(np.arange(traj.nFrames)[frames])
+    if isinstance(traj, BinaryTrajectory):
+        if getattr(traj, key) is None:
+            raise ValueError('No {} in {}, level is {}'.format(key, traj.source, traj.level))
+        return np.asarray(getattr(traj, key)[:, atoms][frames], dtype=float)
+    return np.stack([getattr(traj.read_frame(ind), key)[atoms] for ind in frames])
+
+
+def atom_groups(frame, groups='element'):
+    ''' Group labels, group of each atom and atoms per group
+
+    groups: 'element' to group by species, None for all atoms, or a label per atom
+    '''
+    if isinstance(groups, str) and groups == 'element':
+        groups = frame.elements
+    elif groups is None:
+        groups = np.full(frame.natoms, 'all')
+    labels, groupIDs = np.unique(np.asarray(groups), return_inverse=True)
+    return labels.tolist(), groupIDs, np.bincount(groupIDs, minlength=len(labels))
+
+
+def main():
+    ''' Convert HISTORY to a binary trajectory store from the command line '''
+    parser = arg.ArgumentParser(description='Convert a DLPOLY HISTORY file to a binary trajectory store')
+    parser.add_argument("history", help="HISTORY file to convert", type=str)
+    parser.add_argument("dest", help="Directory to write store to", type=str)
+    parser.add_argument("-p", "--precision", help="Floating point precision", choices=('single', 'double'),
+                        default='single')
+    parser.add_argument("-b", "--block", help="Frames converted per block", type=int, default=64)
+    args = parser.parse_args()
+    traj = convert_history(args.history, args.dest,
+                           dtype=np.float32 if args.precision == 'single' else np.float64,
+                           blockFrames=args.block)
+    print("Wrote {} frames of {} atoms to {}".format(traj.nFrames, traj.natoms, args.dest))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,54 @@
 Module containing utility functions supporting the DLPOLY Python Workflow
 '''
 
+import bz2
+import gzip
+import lzma
 import math
 import itertools
+import os.path
 import numpy as np
 from abc import ABC
 
 COMMENT_CHAR = '#'
 
+# Compression modules by file extension and by magic number
+COMPRESSION = {'gz': gzip, 'bz2': bz2, 'xz': lzma}
+_MAGIC = ((b'\x1f\x8b', gzip), (b'BZh', bz2), (b'\xfd7zXZ\x00', lzma))
+
+
+def compression_of(filename, mode='r'):
+    ''' Compression module for filename: from magic number if reading, else from extension '''
+    if 'r' in mode:
+        with open(filename, 'rb') as fileIn:
+            start = fileIn.read(6)
+        return next((module for magic, module in _MAGIC if start.startswith(magic)), None)
+    return COMPRESSION.get(os.path.splitext(filename)[1].lstrip('.'))
+
+
+def open_file(filename, mode='r', compression=None):
+    ''' Open a plain, gzip, bzip2 or xz compressed file as a stream
+
+    Compression is detected from the file contents when reading and from the extension
+    (or compression: 'gz', 'bz2', 'xz') when writing
+    '''
+    module = COMPRESSION[compression] if compression else compression_of(filename, mode)
+    if module is None:
+        return open(filename, mode)
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    return module.open(filename, mode)
+
+
+def read_appended(filename, position):
+    ''' Complete lines of filename after byte position, with the byte offset just past each '''
+    with open_file(filename, 'rb') as inFile:
+        inFile.seek(position)
+        data = inFile.read()
+    lines = data.split(b'\n')[:-1]
+    ends = position + np.cumsum([len(line) + 1 for line in lines], dtype=np.int64)
+    return [line.decode(errors='replace') for line in lines], ends
+
 
 def peek(iterable):
     ''' Test generator without modifying '''
@@ -48,17 +89,136 @@ def build_3d_rotation_matrix(alpha=0., beta=0., gamma=0., units='rad'):
     return matrix
 
 
+class LazyLoader():
+    ''' Mixin deferring a full read of a source until one of the _deferred attributes is requested '''
+    _deferred = ()
+
+    def defer(self, source):
+        ''' Postpone reading source until a deferred attribute is first accessed '''
+        self.__dict__['_deferredDefaults'] = {key: self.__dict__.pop(key) for key in self._deferred
+                                              if key in self.__dict__}
+        self.__dict__['_pendingSource'] = source
+
+    loaded = property(lambda self: '_pendingSource' not in self.__dict__)
+
+    def load(self):
+        ''' Complete any deferred read '''
+        if not self.loaded:
+            source = self.__dict__.pop('_pendingSource')
+            self.__dict__.update(self.__dict__.pop('_deferredDefaults'))
+            self._read_deferred(source)
+        return self
+
+    def _read_deferred(self, source):
+        ''' Complete a deferred read of source, by default reading it in full '''
+        self.read(source)
+
+    def __getattr__(self, key):
+        if key in self._deferred and not self.loaded:
+            self.load()
+            return getattr(self, key)
+        raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, key))
+
+
+def _unwrap(vals):
+    ''' Reduce a sequence to its first element for scalar types '''
+    if isinstance(vals, (tuple, list)) and vals:
+        return vals[0]
+    return vals
+
+
+def _type_error(vals, dType):
+    ''' Report and raise an invalid cast '''
+    if isinstance(dType, tuple):
+        msg = 'Type of {} ({}) not valid, must be castable to {}'.format(
+            vals, [type(x).__name__ for x in vals], [x.__name__ for x in dType if x is not ...])
+    else:
+        msg = 'Type of {} ({}) not valid, must be castable to {}'.format(vals, type(vals).__name__, dType.__name__)
+    print(msg)
+    return TypeError(msg)
+
+
+def build_converter(dType):
+    ''' Build a function casting an assigned value to dType '''
+    if isinstance(dType, tuple):
+        if ... in dType:
+            loc = dType.index(...)
+            pre, ellided, post = dType[:loc], dType[loc-1], dType[loc+1:]
+
+            def convert(vals):
+                try:
+                    return ([targetType(item) for item, targetType in zip(vals[:loc], pre)] +
+                            [ellided(item) for item in vals[loc:len(vals)-len(post)]] +
+                            [targetType(item) for item, targetType in zip(vals[len(vals)-len(post):], post)])
+                except TypeError:
+                    raise _type_error(vals, dType)
+        else:
+            def convert(vals):
+                try:
+                    return [targetType(item) for item, targetType in zip(vals, dType)]
+                except TypeError:
+                    raise _type_error(vals, dType)
+
+    elif dType is tuple:
+        def convert(vals):
+            return vals if isinstance(vals, tuple) else tuple(vals)
+
+    elif dType is bool:  # If present true unless explicitly false
+        def convert(vals):
+            vals = _unwrap(vals)
+            return vals if isinstance(vals, bool) else vals not in (0, False)
+
+    else:
+        def convert(vals):
+            vals = _unwrap(vals)
+            if isinstance(vals, dType):  # Already right type
+                return vals
+            try:
+                return dType(vals)
+            except TypeError:
+                raise _type_error(vals, dType)
+
+    return convert
+
+
+# Converters for each dataTypes schema seen, built on first use
+_CONVERTERS = {}
+
+
+def schema_converters(dataTypes):
+    ''' Cached dictionary of converters for a dataTypes schema '''
+    schema = tuple(dataTypes.items())
+    converters = _CONVERTERS.get(schema)
+    if converters is None:
+        converters = _CONVERTERS[schema] = {key: build_converter(dType) for key, dType in schema}
+    return converters
+
+
 class DLPData(ABC):
     ''' Abstract datatype for handling automatic casting and restricted assignment '''
 
     def __init__(self, dataTypes):
+        self.__dict__['_converters'] = schema_converters(dataTypes)
         self._dataTypes = dataTypes
 
+    def __getstate__(self):
+        # Converters are closures, so are rebuilt from the schema rather than pickled
+        return {key: val for key, val in self.__dict__.items() if key != '_converters'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__['_converters'] = schema_converters(self._dataTypes)
+
     dataTypes = property(lambda self: self._dataTypes)
     keys = property(lambda self: [key for key in self.dataTypes])
     className = property(lambda self: type(self).__name__)
 
     def __setattr__(self, key, val):
+        converter = self._converters.get(key)
+        if converter is not None:
+            self.__dict__[key] = converter(val)
+            return
+
         if key == '_dataTypes':  # Protect datatypes
             if not hasattr(self, 'dataTypes'):
                 self.__dict__[key] = val
@@ -69,12 +229,7 @@ class DLPData(ABC):
         if key == 'source':  # source is not really a keyword
             return
 
-        if key not in self.dataTypes:
-            print('Param {} not allowed in {} definition'.format(key, self.className.lower()))
-            return
-
-        val = self._map_types(key, val)
-        self.__dict__[key] = val
+        print('Param {} not allowed in {} definition'.format(key, self.className.lower()))
 
     def __getitem__(self, key):
         return getattr(self, str(key))
@@ -82,58 +237,10 @@ class DLPData(ABC):
     def __setitem__(self, key, val):
         setattr(self, key, val)
 
+    def set_trusted(self, **values):
+        ''' Assign values already of the declared types (e.g. from our own parsers) without conversion '''
+        self.__dict__.update(values)
+
     def _map_types(self, key, vals):
         ''' Map argument types to their respective types '''
-        dType = self._dataTypes[key]
-        if isinstance(vals, (tuple, list)) and not isinstance(dType, (tuple, bool)) and dType is not tuple:
-            if not vals:
-                pass
-            elif len(vals) == 1:
-                vals = vals[0]
-            else:
-                for arg in vals:
-                    try:
-                        vals = arg
-                        break
-                    except TypeError:
-                        pass
-                else:
-                    raise TypeError('No arg of {} ({}) for key {} valid, must be castable to {}'.format(
-                        vals,
-                        [type(x).__name__ for x in vals], key,
-                        dType.__name__))
-
-        if isinstance(dType, tuple):
-            try:
-                if ... in dType:
-                    loc = dType.index(...)
-                    if loc != len(dType)-1:
-                        pre, ellided, post = dType[:loc], dType[loc-1], dType[loc+1:]
-                        val = ([targetType(item) for item, targetType in zip(vals[:loc], pre)] +
-                               [ellided(item) for item in vals[loc:-len(post)]] +
-                               [targetType(item) for item, targetType in zip(vals[-len(post):], post)])
-                    else:
-                        pre, ellided = dType[:loc], dType[loc-1]
-                        val = ([targetType(item) for item, targetType in zip(vals[:loc], pre)] +
-                               [ellided(item) for item in vals[loc:]])
-
-                else:
-                    val = [targetType(item) for item, targetType in zip(vals, dType)]
-            except TypeError:
-                print('Type of {} ({}) not valid, must be castable to {}'.format(vals,
-                                                                                 [type(x).__name__ for x in vals],
-                                                                                 [x.__name__ for x in dType]))
-
-        elif isinstance(vals, dType):  # Already right type
-            val = vals
-        elif dType is bool:  # If present true unless explicitly false
-            val = vals not in (0, False)
-
-        else:
-            try:
-                val = self._dataTypes[key](vals)
-            except TypeError as err:
-                print(err)
-                print('Type of {} ({}) not valid, must be castable to {}'.format(vals, type(vals).__name__,
-                                                                                 dType.__name__))
-        return val
+        return self._converters[key](vals)
@@ -0,0 +1,71 @@
+'''
+Module to calculate velocity autocorrelation functions and vibrational densities of states
+'''
+
+import numpy as np
+from dlpoly.correlation import vector_correlate
+from dlpoly.trajectory import atom_chunked, atom_groups, trajectory_array
+
+# Conversion from THz to cm^-1
+THZ_TO_WAVENUMBER = 33.35641
+
+
+class VAF():
+    ''' Velocity autocorrelation of groups of atoms from a level >= 1 HISTORY file or binary store
+
+    groups: 'element' to average per species, None for all atoms, or a label per atom
+    chunkAtoms: atoms processed at once (default: sized to maxBytes of working memory), see MSD
+    massWeighted: weight each atom's autocorrelation by its mass (from HISTORY)
+
+    After calculation, labels, counts, times and vaf (nGroups, nFrames) are available,
+    averaged over all time origins and atoms of each group.
+    '''
+    maxBytes = 1 << 28
+
+    def __init__(self, source=None, groups='element', frames=slice(None), chunkAtoms=None, massWeighted=False):
+        self.labels = []
+        self.counts = np.zeros(0, dtype=int)
+        self.times = np.zeros(0)
+        self.vaf = np.zeros((0, 0))
+        if source is not None:
+            self.calculate(source, groups, frames, chunkAtoms, massWeighted)
+
+    def calculate(self, source, groups='element', frames=slice(None), chunkAtoms=None, massWeighted=False):
+        ''' Accumulate VAF of each group over chunks of atoms '''
+        with atom_chunked(source, 'velocities', frames, chunkAtoms, self.maxBytes) as (traj, inds, first, chunkAtoms):
+            nAtoms, nTimes = first.natoms, len(inds)
+            self.labels, groupIDs, self.counts = atom_groups(first, groups)
+            self.times = traj.times[inds] - traj.times[inds[0]]
+            weights = first.masses if massWeighted else np.ones(nAtoms)
+
+            totals = np.zeros((len(self.labels), nTimes))
+            for start in range(0, nAtoms, chunkAtoms):
+                atoms = slice(start, min(start + chunkAtoms, nAtoms))
+                atomVAF = vector_correlate(trajectory_array(traj, 'velocities', inds, atoms)) * weights[atoms]
+                np.add.at(totals, groupIDs[atoms], atomVAF.T)
+
+        self.vaf = totals / self.counts[:, None]
+        return self
+
+    def __getitem__(self, label):
+        return self.vaf[self.labels.index(label)]
+
+    normalised = property(lambda self: self.vaf / self.vaf[:, :1])
+
+    def dos(self, window=np.hanning, normalise=True):
+        ''' Vibrational density of states of each group as the Fourier transform of its VAF
+
+        window: function of length applied to the symmetric VAF to reduce truncation ringing
+        normalise: scale each spectrum to unit area
+        Returns: frequencies (THz, multiply by THZ_TO_WAVENUMBER for cm^-1), spectra (nGroups, nFrequencies)
+        '''
+        step = self.times[1] - self.times[0]
+        symmetric = np.concatenate((self.vaf[:, :0:-1], self.vaf), axis=1)
+        if window is not None:
+            symmetric = symmetric * window(symmetric.shape[1])
+        # Shift t = 0 to the start so the transform of the even function is real
+        spectra = np.fft.rfft(np.fft.ifftshift(symmetric, axes=1), axis=1).real * step
+        frequencies = np.fft.rfftfreq(symmetric.shape[1], step)
+        if normalise:
+            spectra /= spectra.sum(axis=1)[:, None] * frequencies[1]
+        return frequencies, spectra
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import dlpoly as dlp
+from dlpoly.cache import FileCache
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.cache = FileCache(os.path.join(self.tmpDir, 'cache'))
+        self.statisFile = os.path.join(self.tmpDir, 'STATIS')
+        shutil.copy('tests/STATIS', self.statisFile)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def test_cache_hit(self):
+        first = self.cache.load(dlp.statis.Statis, self.statisFile)
+        second = self.cache.load(dlp.statis.Statis, self.statisFile)
+        self.assertEqual(len(os.listdir(self.cache.cacheDir)), 1,
+                         'incorrect number of cache entries')
+        self.assertTrue((first.data == second.data).all(),
+                        'cached data differs')
+
+    def test_cache_invalidate(self):
+        first = self.cache.load(dlp.statis.Statis, self.statisFile)
+        with open(self.statisFile) as inFile:
+            lines = inFile.readlines()
+        # Drop the last record
+        with open(self.statisFile, 'w') as outFile:
+            outFile.writelines(lines[:-(first.columns//5 + 2)])
+        second = self.cache.load(dlp.statis.Statis, self.statisFile)
+        self.assertEqual(second.rows, first.rows - 1,
+                         'stale cache entry used')
+
+    def test_cache_field(self):
+        fieldFile = os.path.join(self.tmpDir, 'FIELD')
+        shutil.copy('tests/FIELD', fieldFile)
+        first = self.cache.load(dlp.field.Field, fieldFile)
+        second = self.cache.load(dlp.field.Field, fieldFile)
+        self.assertEqual(len(os.listdir(self.cache.cacheDir)), 1, 'field not cached')
+        self.assertEqual(list(second.molecules), list(first.molecules), 'cached molecules differ')
+        self.assertEqual(sorted(second.species), sorted(first.species), 'cached species differ')
+        # Unpickled data still casts on assignment
+        species = second.species['OW']
+        species.mass = '16'
+        self.assertEqual(species.mass, 16., 'cached field lost its converters')
+
+    def test_cache_config(self):
+        configFile = os.path.join(self.tmpDir, 'CONFIG')
+        shutil.copy('tests/CONFIG', configFile)
+        first = self.cache.load(dlp.config.Config, configFile, lazy=True)
+        self.assertTrue(first.loaded, 'deferred config cached')
+        second = self.cache.load(dlp.config.Config, configFile, lazy=True)
+        self.assertEqual(len(os.listdir(self.cache.cacheDir)), 1, 'config not cached')
+        self.assertEqual(second.natoms, first.natoms, 'cached number of atoms differs')
+        self.assertTrue(np.array_equal(second.positions, first.positions), 'cached positions differ')
+        self.assertTrue(np.array_equal(second.cell, first.cell), 'cached cell differs')
+
+    def test_cache_failed_store(self):
+        with mock.patch('pickle.dump', side_effect=pickle.PicklingError('unpicklable')):
+            with self.assertRaises(pickle.PicklingError):
+                self.cache.load(dlp.statis.Statis, self.statisFile)
+        self.assertListEqual(os.listdir(self.cache.cacheDir), [], 'partial cache entry left behind')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(CacheTest('test_cache_hit'))
+    suite.addTest(CacheTest('test_cache_invalidate'))
+    suite.addTest(CacheTest('test_cache_field'))
+    suite.addTest(CacheTest('test_cache_config'))
+    suite.addTest(CacheTest('test_cache_failed_store'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
-import dlpoly as dlp
+import os
+import tempfile
 import unittest
+import dlpoly as dlp
 
 
 class ConfigTest(unittest.TestCase):
@@ -51,6 +53,110 @@ class ConfigTest(unittest.TestCase):
                              [-114729.0839, 191994.0141, -110473.8008],
                              'incorrect forces')
 
+    def test_config_arrays(self):
+        self.assertEqual(self.config.positions.shape, (99120, 3),
+                         'incorrect positions shape')
+        self.assertEqual(self.config.positions.dtype, float,
+                         'incorrect positions type')
+        self.assertListEqual(list(self.config.positions[100]),
+                             list(self.config.atoms[100].pos),
+                             'atom view does not match arrays')
+        self.assertEqual(self.config.elements[100], 'CK',
+                         'incorrect element array')
+
+    def test_config_write_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            first, second = os.path.join(tmpDir, 'first'), os.path.join(tmpDir, 'second')
+            self.config.write(first, level=2)
+            dlp.config.Config(first).write(second, level=2)
+            with open(first) as fileA, open(second) as fileB:
+                self.assertEqual(fileA.read(), fileB.read(), 'written config not reproducible')
+            reread = dlp.config.Config(first)
+            self.assertListEqual(list(reread.forces[100]), list(self.config.forces[100]),
+                                 'incorrect written forces')
+
+    def test_config_indexed(self):
+        with dlp.config.Config.open_indexed("tests/CONFIG") as indexed:
+            self.assertEqual(indexed.natoms, self.config.natoms,
+                             'incorrect indexed number of atoms')
+            self.assertEqual(indexed[100].element, 'CK',
+                             'incorrect indexed element')
+            self.assertListEqual(list(indexed[100].vel), list(self.config.atoms[100].vel),
+                                 'incorrect indexed velocities')
+            self.assertListEqual(list(indexed[10:5000:7].indices), list(self.config.indices[10:5000:7]),
+                                 'incorrect indexed slice')
+
+    def test_config_lazy(self):
+        config = dlp.DLPoly(config="tests/CONFIG").config
+        self.assertFalse(config.loaded, 'config loaded eagerly')
+        self.assertEqual(config.natoms, 99120, 'incorrect header number of atoms')
+        self.assertFalse(config.loaded, 'config loaded by header access')
+        self.assertEqual(config.atoms[100].element, 'CK', 'incorrect lazily loaded element')
+        self.assertTrue(config.loaded, 'config not loaded on access')
+
+    def test_config_lazy_header(self):
+        config = dlp.DLPoly(config="tests/CONFIG").config
+        cell = config.cell * 2
+        config.title, config.cell, config.level = 'modified', cell, 0
+        self.assertListEqual(list(config.positions[100]), list(self.config.positions[100]),
+                             'incorrect lazily loaded positions')
+        self.assertListEqual(list(config.velocities[100]), list(self.config.velocities[100]),
+                             'incorrect lazily loaded velocities')
+        self.assertEqual(config.title, 'modified', 'title reset by lazy load')
+        self.assertEqual(config.level, 0, 'level reset by lazy load')
+        self.assertIs(config.cell, cell, 'cell reset by lazy load')
+        self.assertTrue((cell == self.config.cell * 2).all(), 'assigned cell overwritten')
+
+        config = dlp.DLPoly(config="tests/CONFIG").config
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filename = os.path.join(tmpDir, 'CONFIG')
+            config.write(filename, level=0)
+            written = dlp.config.Config(filename)
+        self.assertEqual(written.level, 0, 'requested level not written')
+        self.assertEqual(config.level, 0, 'level reset by lazy load on write')
+        self.assertListEqual(list(written.positions[100]), list(self.config.positions[100]),
+                             'incorrect written positions')
+
+    def test_config_chunks(self):
+        chunks = list(dlp.config.Config.iter_chunks("tests/CONFIG", chunkAtoms=40000))
+        self.assertListEqual([chunk.natoms for chunk in chunks], [40000, 40000, 19120],
+                             'incorrect chunk sizes')
+        self.assertListEqual(list(chunks[1].positions[0]), list(self.config.positions[40000]),
+                             'incorrect chunk positions')
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filename = os.path.join(tmpDir, 'streamed')
+            with dlp.config.ConfigWriter(filename, self.config.title, 2, self.config.pbc,
+                                         self.config.cell, renumber=True) as writer:
+                for chunk in chunks[::2]:
+                    writer.write(chunk)
+            streamed = dlp.config.Config(filename)
+            self.assertEqual(streamed.natoms, 59120, 'incorrect streamed number of atoms')
+            self.assertEqual(streamed.indices[-1], 59120, 'incorrect streamed index')
+
+    def test_config_chunks_compressed(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filename = os.path.join(tmpDir, 'streamed.gz')
+            with dlp.config.ConfigWriter(filename, self.config.title, 2, self.config.pbc,
+                                         self.config.cell) as writer:
+                for chunk in dlp.config.Config.iter_chunks("tests/CONFIG", chunkAtoms=40000):
+                    writer.write(chunk)
+            self.assertTrue(writer._outFile.closed, 'compressed stream not closed')
+            streamed = dlp.config.Config(filename)
+            self.assertEqual(streamed.natoms, 99120, 'incorrect streamed number of atoms')
+            self.assertListEqual(list(streamed.positions[99119]), list(self.config.positions[99119]),
+                                 'incorrect streamed positions')
+
+    def test_config_compressed(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filename = os.path.join(tmpDir, 'CONFIG.gz')
+            self.config.write(filename, level=2)
+            with open(filename, 'rb') as inFile:
+                self.assertEqual(inFile.read(2), b'\x1f\x8b', 'output not compressed')
+            compressed = dlp.config.Config(filename)
+            self.assertEqual(compressed.natoms, 99120, 'incorrect compressed number of atoms')
+            self.assertListEqual(list(compressed.velocities[100]), list(self.config.velocities[100]),
+                                 'incorrect compressed velocities')
+
 
 def suite():
     suite = unittest.TestSuite()
@@ -59,6 +165,14 @@ def suite():
     suite.addTest(ConfigTest('test_config_pbc'))
     suite.addTest(ConfigTest('test_config_cell'))
     suite.addTest(ConfigTest('test_config_atom'))
+    suite.addTest(ConfigTest('test_config_arrays'))
+    suite.addTest(ConfigTest('test_config_write_roundtrip'))
+    suite.addTest(ConfigTest('test_config_indexed'))
+    suite.addTest(ConfigTest('test_config_lazy'))
+    suite.addTest(ConfigTest('test_config_lazy_header'))
+    suite.addTest(ConfigTest('test_config_chunks'))
+    suite.addTest(ConfigTest('test_config_chunks_compressed'))
+    suite.addTest(ConfigTest('test_config_compressed'))
     return suite
 
 
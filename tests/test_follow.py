@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import numpy as np
+import dlpoly as dlp
+from dlpoly.follow import StatisFollower, OutputFollower, HistoryFollower
+from test_history import make_frames, write_history
+
+
+class FollowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpDir.cleanup)
+
+    def _grow(self, source, follower, cuts):
+        ''' Append source to the followed file in pieces, polling after each '''
+        with open(source, 'rb') as inFile:
+            data = inFile.read()
+        results = []
+        with open(follower.filename, 'wb') as outFile:
+            for start, end in zip((0,) + cuts, cuts + (len(data),)):
+                outFile.write(data[start:end])
+                outFile.flush()
+                results.append(follower.poll())
+        return results
+
+    def test_follow_statis(self):
+        follower = StatisFollower(os.path.join(self.tmpDir.name, 'STATIS'))
+        self.assertEqual(len(follower.poll()), 0, 'rows from missing file')
+        results = self._grow('tests/STATIS', follower, (50, 700, 701, 2500))
+        statis = dlp.statis.Statis('tests/STATIS')
+        rows = np.concatenate([rows for rows in results if len(rows)])
+        self.assertTrue(np.array_equal(rows, statis.data), 'incorrect rows')
+        self.assertEqual(len(results[1]), 0, 'partial record returned')
+
+    def test_follow_output(self):
+        follower = OutputFollower(os.path.join(self.tmpDir.name, 'OUTPUT'))
+        size = os.path.getsize('tests/OUTPUT')
+        results = self._grow('tests/OUTPUT', follower, tuple(range(size//2, size, 3000)))
+        blocks = [block for result in results for block in result]
+        self.assertListEqual([block['step'] for block in blocks],
+                             sorted({block['step'] for block in blocks}), 'duplicate or unordered blocks')
+        self.assertEqual(blocks[0]['step'], 0, 'incorrect first step')
+        self.assertAlmostEqual(blocks[1]['temp_tot'], 298.42, msg='incorrect value')
+        self.assertAlmostEqual(blocks[1]['averages']['press'], 0.94717, msg='incorrect average')
+
+    def test_follow_history(self):
+        source = os.path.join(self.tmpDir.name, 'HISTORY.src')
+        write_history(source, make_frames(5, 10))
+        follower = HistoryFollower(os.path.join(self.tmpDir.name, 'HISTORY'))
+        size = os.path.getsize(source)
+        results = self._grow(source, follower, (size//3, size//3 + 10, size - 5))
+        self.assertListEqual([frame.step for result in results for frame in result], [0, 10, 20, 30, 40],
+                             'incorrect frames')
+        follower.close()
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(FollowTest('test_follow_statis'))
+    suite.addTest(FollowTest('test_follow_output'))
+    suite.addTest(FollowTest('test_follow_history'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+import dlpoly as dlp
+from dlpoly.greenkubo import GreenKubo, KATM_TO_PA, ANGSTROM3_TO_M3, PS_TO_S, BOLTZMANN
+
+
+def make_statis(stress, step=0.01, volume=1000., temperature=300.):
+    ''' Statis of an NVE run with the given (nRows, 9) stress tensors '''
+    statis = dlp.statis.Statis()
+    statis.rows, statis.columns = len(stress), 37
+    statis.data = np.zeros((statis.rows, statis.columns + 3))
+    statis.data[:, 1] = np.arange(statis.rows) * step
+    statis.data[:, 2] = statis.columns
+    statis.gen_labels(dlp.control.Control())
+    statis['volume'][:] = volume
+    statis['temperature'][:] = temperature
+    statis['stress'][:] = stress
+    return statis
+
+
+class GreenKuboTest(unittest.TestCase):
+
+    def setUp(self):
+        # Exponentially correlated xy (= yx) shear stress and xx normal stress
+        rng = np.random.RandomState(2)
+        self.decay, self.sigma, nRows = 0.9, 0.5, 100000
+        noise = rng.normal(size=(nRows, 2)) * self.sigma * np.sqrt(1 - self.decay**2)
+        series = np.zeros((nRows, 2))
+        for i in range(1, nRows):
+            series[i] = self.decay * series[i-1] + noise[i]
+        stress = np.zeros((nRows, 9))
+        stress[:, 1] = stress[:, 3] = series[:, 0]
+        stress[:, 0] = series[:, 1]
+        self.statis = make_statis(stress)
+        # Integral of each autocorrelation, sum_t sigma^2 decay^t by the trapezoidal rule
+        integral = self.sigma**2 * 0.01 * (1 + self.decay) / (2 * (1 - self.decay))
+        self.scaled = integral * 1000. * ANGSTROM3_TO_M3 * KATM_TO_PA**2 * PS_TO_S / (BOLTZMANN * 300.)
+
+    def test_greenkubo_viscosity(self):
+        greenKubo = GreenKubo(self.statis, segmentRows=10000)
+        self.assertEqual(greenKubo.segments['shear'].shape[0], 10, 'incorrect number of segments')
+        # Two off-diagonal components and the traceless part (2/3 of xx squared) of the normal stress
+        shear, error = greenKubo.shear_viscosity
+        self.assertLess(abs(shear - self.scaled * (2 + 2./3.) / 10), 3 * error, 'incorrect shear viscosity')
+        bulk, error = greenKubo.bulk_viscosity
+        self.assertLess(abs(bulk - self.scaled / 9), 3 * error, 'incorrect bulk viscosity')
+
+    def test_greenkubo_running_integral(self):
+        greenKubo = GreenKubo(self.statis, maxLag=200)
+        self.assertEqual(greenKubo.integral['shear'].shape, (200,), 'incorrect number of lags')
+        self.assertEqual(greenKubo.integral['shear'][0], 0., 'running integral starts from zero')
+        self.assertTrue(np.allclose(greenKubo.lags[:2], (0., 0.01)), 'incorrect lags')
+
+    def test_greenkubo_unlabelled(self):
+        with self.assertRaises(ValueError):
+            GreenKubo(dlp.statis.Statis('tests/STATIS'))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(GreenKuboTest('test_greenkubo_viscosity'))
+    suite.addTest(GreenKuboTest('test_greenkubo_running_integral'))
+    suite.addTest(GreenKuboTest('test_greenkubo_unlabelled'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
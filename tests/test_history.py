@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from dlpoly.history import History, HistoryWriter, Frame
+
+
+def make_frames(nFrames, nAtoms, level=2, pbc=2):
+    ''' Synthetic trajectory frames '''
+    rng = np.random.default_rng(7)
+    frames = []
+    for i in range(nFrames):
+        frame = Frame()
+        frame.resize(nAtoms)
+        frame.level, frame.pbc = level, pbc
+        frame.cell = np.diag([10., 11., 12.]) * (1. + 0.01*i)
+        frame.elements = np.array(['Na', 'Cl'] * (nAtoms // 2))
+        frame.indices = np.arange(1, nAtoms+1)
+        frame.positions = rng.random((nAtoms, 3)) * 10.
+        frame.velocities = rng.random((nAtoms, 3))
+        frame.forces = rng.random((nAtoms, 3))
+        frame.masses = np.tile([22.99, 35.45], nAtoms // 2)
+        frame.charges = np.tile([1., -1.], nAtoms // 2)
+        frame.step, frame.timestep = 10*i, 0.001
+        frame.time = frame.step * frame.timestep
+        frames.append(frame)
+    return frames
+
+
+def write_history(path, frames, level=2, pbc=2):
+    ''' Write frames to a formatted HISTORY file '''
+    with HistoryWriter(path, 'test', level=level, pbc=pbc, natoms=frames[0].natoms) as writer:
+        for frame in frames:
+            writer.write(frame)
+
+
+class HistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpDir.cleanup)
+        self.path = os.path.join(self.tmpDir.name, 'HISTORY')
+        self.frames = make_frames(12, 20)
+
+    def test_history_index(self):
+        write_history(self.path, self.frames)
+        with History(self.path) as hist:
+            self.assertEqual(len(hist), 12, 'incorrect number of frames')
+            self.assertListEqual(list(hist.steps), [10*i for i in range(12)], 'incorrect steps')
+            self.assertTrue(np.allclose(hist.cells[5], self.frames[5].cell), 'incorrect cell')
+
+    def test_history_access(self):
+        write_history(self.path, self.frames)
+        with History(self.path) as hist:
+            frame = hist[-2]
+            self.assertEqual(frame.step, 100, 'incorrect step')
+            self.assertTrue(np.allclose(frame.positions, self.frames[10].positions), 'incorrect positions')
+            self.assertTrue(np.allclose(frame.forces, self.frames[10].forces), 'incorrect forces')
+            self.assertTrue(np.allclose(frame.charges, self.frames[10].charges), 'incorrect charges')
+            self.assertListEqual([frame.step for frame in hist[1:9:3]], [10, 40, 70], 'incorrect slice')
+            self.assertEqual(hist.positions(slice(0, 4)).shape, (4, 20, 3), 'incorrect stacked shape')
+
+    def test_history_incremental(self):
+        write_history(self.path, self.frames[:5])
+        with History(self.path) as hist:
+            self.assertEqual(len(hist), 5, 'incorrect number of frames')
+            indexed = hist.index['ends'][-1]
+        self.assertTrue(os.path.isfile(self.path + '.idx.npz'), 'index not saved')
+
+        # Grown file with a partially written final frame
+        write_history(self.path, self.frames)
+        with open(self.path, 'rb') as inFile:
+            data = inFile.read()
+        with open(self.path, 'wb') as outFile:
+            outFile.write(data[:-100])
+        with mock.patch.object(History, '_scan', autospec=True, side_effect=History._scan) as scan:
+            hist = History(self.path)
+        # Saved index extended despite the header counts changing
+        self.assertEqual(scan.call_args[0][1], indexed, 'grown file rescanned from the start')
+        with hist:
+            self.assertEqual(len(hist), 11, 'partial frame indexed')
+            with open(self.path, 'ab') as outFile:
+                outFile.write(data[-100:])
+            hist.refresh()
+            self.assertEqual(len(hist), 12, 'index not extended')
+            self.assertEqual(hist[11].step, 110, 'incorrect appended frame')
+
+    def test_history_rewritten(self):
+        write_history(self.path, self.frames)
+        with History(self.path) as hist:
+            self.assertTrue(np.allclose(hist.cells[3], self.frames[3].cell), 'incorrect cell')
+        size, mtime = os.path.getsize(self.path), os.stat(self.path).st_mtime_ns
+
+        # Rerun giving a file of the same size with different cells after the first frame
+        for frame in self.frames[1:]:
+            frame.cell = frame.cell * 1.05
+        write_history(self.path, self.frames)
+        self.assertEqual(os.path.getsize(self.path), size, 'rewritten file changed size')
+        os.utime(self.path, ns=(mtime + 10**9, mtime + 10**9))
+        with History(self.path) as hist:
+            self.assertEqual(len(hist), 12, 'incorrect number of frames')
+            self.assertTrue(np.allclose(hist.cells[3], self.frames[3].cell), 'stale index reused')
+
+    def test_history_compressed(self):
+        write_history(self.path + '.gz', self.frames)
+        with gzip.open(self.path + '.gz', 'rb') as inFile, open(self.path, 'wb') as outFile:
+            shutil.copyfileobj(inFile, outFile)
+        with History(self.path) as hist:
+            self.assertEqual(len(hist), 12, 'incorrect number of frames')
+            self.assertTrue(np.allclose(hist[11].positions, self.frames[11].positions), 'incorrect positions')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(HistoryTest('test_history_index'))
+    suite.addTest(HistoryTest('test_history_access'))
+    suite.addTest(HistoryTest('test_history_incremental'))
+    suite.addTest(HistoryTest('test_history_rewritten'))
+    suite.addTest(HistoryTest('test_history_compressed'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
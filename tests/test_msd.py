@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from dlpoly.history import History
+from dlpoly.msd import MSD, msd_fft
+from dlpoly.pbc import wrap, unwrap_trajectory
+from test_history import make_frames, write_history
+
+
+class MSDTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.cell = np.diag([8., 9., 10.])
+        self.walk = np.cumsum(rng.normal(scale=0.3, size=(40, 6, 3)), axis=0)
+
+    def test_msd_fft(self):
+        nTimes = len(self.walk)
+        brute = np.array([((self.walk[lag:] - self.walk[:nTimes-lag])**2).sum(axis=2).mean(axis=0)
+                          for lag in range(nTimes)])
+        self.assertTrue(np.allclose(msd_fft(self.walk), brute), 'incorrect FFT MSD')
+
+    def test_msd_unwrap(self):
+        wrapped = wrap(self.walk, self.cell, 2)
+        self.assertTrue(np.allclose(unwrap_trajectory(wrapped, self.cell, 2) - wrapped[0],
+                                    self.walk - self.walk[0]), 'incorrect unwrapping')
+
+    def test_msd_trajectory(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'HISTORY')
+            frames = make_frames(len(self.walk), 6)
+            for frame, positions in zip(frames, self.walk):
+                frame.cell = self.cell
+                frame.positions = wrap(positions, self.cell, 2)
+            write_history(path, frames)
+            with mock.patch.object(History, 'read_frame', autospec=True, side_effect=History.read_frame) as read:
+                msd = MSD(path, chunkAtoms=4)
+        # Each frame parsed once into a temporary store, not once per chunk of atoms
+        self.assertEqual(read.call_count, len(self.walk) + 1, 'HISTORY reparsed for each chunk')
+        self.assertListEqual(msd.labels, ['Cl', 'Na'], 'incorrect species')
+        expected = msd_fft(self.walk)[:, 1::2].mean(axis=1)
+        self.assertTrue(np.allclose(msd['Cl'], expected, atol=1e-6), 'incorrect species MSD')
+        self.assertEqual(len(msd.diffusion()), 2, 'missing diffusion coefficients')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(MSDTest('test_msd_fft'))
+    suite.addTest(MSDTest('test_msd_unwrap'))
+    suite.addTest(MSDTest('test_msd_trajectory'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
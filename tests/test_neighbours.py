@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+import dlpoly as dlp
+from dlpoly.neighbours import CellList
+from dlpoly.pbc import minimum_image
+
+
+class NeighboursTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(42)
+
+    def _check(self, cell, pbc, cutoff):
+        positions = self.rng.random((400, 3)) @ cell
+        i, j, dist = CellList(positions, cell, pbc, cutoff).pairs()
+        first, second = np.triu_indices(len(positions), 1)
+        sep = minimum_image(positions[second] - positions[first], cell, pbc)
+        close = np.linalg.norm(sep, axis=1) < cutoff
+        self.assertSetEqual(set(zip(i, j)), set(zip(first[close], second[close])),
+                            'incorrect pairs')
+        self.assertTrue(np.allclose(dist, np.linalg.norm(minimum_image(positions[j] - positions[i], cell, pbc),
+                                                         axis=1)),
+                        'incorrect distances')
+
+    def test_neighbours_orthorhombic(self):
+        self._check(np.diag([10., 12., 14.]), 2, 3.)
+
+    def test_neighbours_triclinic(self):
+        self._check(np.array([[10., 0., 0.], [3., 9., 0.], [2., 1.5, 11.]]), 3, 3.)
+
+    def test_neighbours_small_cell(self):
+        self._check(np.diag([7., 7., 7.]), 1, 3.4)
+
+    def test_neighbours_config(self):
+        config = dlp.config.Config()
+        config.add_atoms([dlp.config.Atom('Ar', [0.5, 0.5, 0.5], index=1),
+                          dlp.config.Atom('Ar', [9.5, 0.5, 0.5], index=2),
+                          dlp.config.Atom('Ar', [5.0, 5.0, 5.0], index=3)])
+        config.pbc = 1
+        config.cell = np.diag([10., 10., 10.])
+        i, j, dist = config.neighbour_pairs(2.)
+        self.assertListEqual(list(zip(i, j)), [(0, 1)], 'periodic image not found')
+        self.assertAlmostEqual(dist[0], 1., msg='incorrect minimum image distance')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(NeighboursTest('test_neighbours_orthorhombic'))
+    suite.addTest(NeighboursTest('test_neighbours_triclinic'))
+    suite.addTest(NeighboursTest('test_neighbours_small_cell'))
+    suite.addTest(NeighboursTest('test_neighbours_config'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
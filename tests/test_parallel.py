@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import operator
+import os
+import tempfile
+import unittest
+import numpy as np
+from dlpoly.parallel import map_frames
+from dlpoly.trajectory import convert_history
+from test_history import make_frames, write_history
+
+
+def centre(frame):
+    ''' Sum of positions for testing '''
+    return frame.positions.sum(axis=0)
+
+
+def step(frame):
+    ''' Frame step for testing '''
+    return frame.step
+
+
+class ParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpDir.cleanup)
+        self.path = os.path.join(self.tmpDir.name, 'HISTORY')
+        self.frames = make_frames(9, 20)
+        write_history(self.path, self.frames)
+
+    def test_parallel_reduce(self):
+        expected = sum(frame.positions.sum(axis=0) for frame in self.frames)
+        total = map_frames(self.path, centre, operator.add, nWorkers=2, chunkFrames=2)
+        self.assertTrue(np.allclose(total, expected), 'incorrect reduction')
+
+    def test_parallel_map(self):
+        steps = map_frames(self.path, step, frames=slice(1, None, 2), nWorkers=2, chunkFrames=3)
+        self.assertListEqual(steps, [10, 30, 50, 70], 'incorrect frame order')
+
+    def test_parallel_binary(self):
+        store = convert_history(self.path, os.path.join(self.tmpDir.name, 'store'), dtype=np.float64)
+        expected = sum(frame.positions.sum(axis=0) for frame in self.frames[2:5])
+        total = map_frames(store.source, centre, operator.add, frames=[2, 3, 4], nWorkers=1)
+        self.assertTrue(np.allclose(total, expected), 'incorrect reduction')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(ParallelTest('test_parallel_reduce'))
+    suite.addTest(ParallelTest('test_parallel_map'))
+    suite.addTest(ParallelTest('test_parallel_binary'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
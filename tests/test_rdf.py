@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import numpy as np
+import dlpoly as dlp
+from dlpoly.rdf import RDF, field_pairs
+from test_history import make_frames, write_history
+
+
+class RDFTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpDir.cleanup)
+        self.path = os.path.join(self.tmpDir.name, 'HISTORY')
+        rng = np.random.default_rng(11)
+        self.frames = make_frames(4, 2000)
+        for frame in self.frames:
+            frame.cell = np.diag([20., 20., 20.])
+            frame.positions = rng.random((2000, 3)) * 20.
+        write_history(self.path, self.frames, pbc=1)
+
+    def test_rdf_ideal(self):
+        rdf = RDF(self.path, cutoff=8., binWidth=0.5, nWorkers=2)
+        self.assertListEqual(rdf.labels, [('Cl', 'Cl'), ('Cl', 'Na'), ('Na', 'Na')], 'incorrect pairs')
+        self.assertEqual(rdf.nFrames, 4, 'incorrect number of frames')
+        self.assertTrue(np.allclose(rdf['Na', 'Cl'][4:], 1., atol=0.15), 'ideal gas g(r) not 1')
+
+    def test_rdf_serial(self):
+        parallel = RDF(self.path, cutoff=5., pairs=[('Na', 'Cl')], nWorkers=2)
+        serial = RDF(self.path, cutoff=5., pairs=[('Na', 'Cl')], nWorkers=1)
+        self.assertTrue(np.array_equal(parallel.counts, serial.counts), 'parallel counts differ')
+
+    def test_rdf_write(self):
+        rdf = RDF(self.frames[0], cutoff=5., binWidth=0.1)
+        outFile = os.path.join(self.tmpDir.name, 'RDFDAT')
+        rdf.write(outFile, 'test')
+        labels, data = dlp.statis.read_rdf(outFile)
+        self.assertListEqual(labels, [list(pair) for pair in rdf.labels], 'incorrect labels')
+        self.assertTrue(np.allclose(data[1, :, 1], rdf.gofr[1], rtol=1e-5), 'incorrect g(r)')
+
+    def test_rdf_field(self):
+        field = dlp.field.Field('tests/FIELD')
+        pairs = field_pairs(field)
+        self.assertEqual(len(pairs), len(field.species)*(len(field.species)+1)//2, 'incorrect number of pairs')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(RDFTest('test_rdf_ideal'))
+    suite.addTest(RDFTest('test_rdf_serial'))
+    suite.addTest(RDFTest('test_rdf_write'))
+    suite.addTest(RDFTest('test_rdf_field'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import numpy as np
+import dlpoly as dlp
+
+
+class StatisTest(unittest.TestCase):
+
+    def setUp(self):
+        self.statis = dlp.statis.Statis('tests/STATIS')
+        with open('tests/STATIS') as inFile:
+            self.text = inFile.read()
+
+    def test_statis_shape(self):
+        self.assertEqual(self.statis.rows, 5, 'incorrect number of rows')
+        self.assertEqual(self.statis.columns, 66, 'incorrect number of columns')
+        self.assertEqual(len(self.statis.labels), 66, 'incorrect number of labels')
+
+    def test_statis_last_rows(self):
+        statis = dlp.statis.Statis('tests/STATIS', lastRows=2)
+        self.assertTrue(np.array_equal(statis.data, self.statis.data[-2:]), 'incorrect final rows')
+
+    def test_statis_chunks(self):
+        statis = dlp.statis.Statis()
+        statis.chunkRows = 2
+        statis.read('tests/STATIS')
+        self.assertTrue(np.array_equal(statis.data, self.statis.data), 'incorrect chunked read')
+
+    def test_statis_chunk_partial(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'STATIS')
+            # Header, three records and part of the first line of the fourth
+            cut = self.text.index('        15')
+            with open(path, 'w') as outFile:
+                outFile.write(self.text[:cut + 15])
+            statis = dlp.statis.Statis()
+            statis.chunkRows = 1
+            statis.read(path)
+            self.assertTrue(np.array_equal(statis.data, self.statis.data[:3]), 'incorrect rows before partial record')
+            chunks = list(dlp.statis.iter_chunks(path, chunkRows=1))
+            self.assertListEqual([chunk.shape for chunk in chunks], [(1, 69)] * 3, 'incorrect chunks')
+
+    def test_statis_update(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'STATIS')
+            # Header, three records and part of the fourth
+            cut = self.text.index('        15')
+            with open(path, 'w') as outFile:
+                outFile.write(self.text[:cut + 100])
+            statis = dlp.statis.Statis(path)
+            self.assertEqual(statis.rows, 3, 'partial record read')
+            with open(path, 'a') as outFile:
+                outFile.write(self.text[cut + 100:])
+            lazy = dlp.statis.Statis(path, lazy=True)
+            self.assertEqual(statis.update(), 2, 'incorrect number of new rows')
+            self.assertEqual(statis.update(), 0, 'rows read twice')
+            self.assertEqual(lazy.update(), 0, 'lazy statis read on update')
+            self.assertEqual(lazy.rows, 5, 'incorrect lazy rows')
+        self.assertTrue(np.array_equal(statis.data, self.statis.data), 'incorrect updated data')
+
+    def test_statis_named_columns(self):
+        statis = dlp.statis.Statis('tests/STATIS', control=dlp.control.Control('tests/CONTROL'))
+        self.assertTrue(np.array_equal(statis['temperature'], statis.data[:, 4]), 'incorrect temperature')
+        self.assertTrue(np.array_equal(statis.time, statis.data[:, 1]), 'incorrect time')
+        self.assertEqual(statis['amsd'].shape, (5, 19), 'incorrect number of species MSDs')
+        self.assertEqual(statis['stress'].shape, (5, 9), 'incorrect stress shape')
+        # Diagonal cell dimensions multiply to the volume of this orthorhombic cell
+        self.assertTrue(np.allclose(np.prod(statis['cell'][:, ::4], axis=1), statis['volume'], rtol=1e-5),
+                        'cell dimensions misplaced')
+        self.assertTrue(np.array_equal(statis['14-1 Instantaneous PV'], statis['pv']), 'incorrect label lookup')
+        for key in ('temperature', 'stress', 'cell'):
+            self.assertTrue(np.shares_memory(statis[key], statis.data), 'column copied')
+        with self.assertRaises(KeyError):
+            statis['not a quantity']
+        # Per-atom MSD data go to MSDTMP, so leave the STATIS columns unchanged
+        control = dlp.control.Control('tests/CONTROL')
+        control.msdtemp = (0, 10)
+        withMSD = dlp.statis.Statis('tests/STATIS', control=control)
+        self.assertListEqual(withMSD.labels, statis.labels, 'msdtemp changed the labels')
+        self.assertTrue(np.array_equal(withMSD['stress'], statis['stress']), 'msdtemp moved the stress')
+
+    def test_statis_export(self):
+        statis = dlp.statis.Statis('tests/STATIS', control=dlp.control.Control('tests/CONTROL'))
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'statis.csv')
+            statis.export(path, ['temperature', 'stress'], stride=2, timeRange=(0.001, None))
+            with open(path) as inFile:
+                header = inFile.readline().strip().split(',')
+            self.assertEqual(header[:3], ['step', 'time', '1-2 System Temperature'], 'incorrect header')
+            table = np.loadtxt(path, delimiter=',', skiprows=1)
+            self.assertTrue(np.allclose(table[:, 0], (5, 15)), 'incorrect rows')
+            self.assertTrue(np.allclose(table[:, 2:], statis.data[1::2, [4] + list(range(50, 59))]),
+                            'incorrect values')
+
+            path = os.path.join(tmpDir, 'statis.npz')
+            statis.export(path, 'pv')
+            with np.load(path) as arrays:
+                self.assertTrue(np.allclose(arrays['14-1_Instantaneous_PV'], statis['pv']), 'incorrect array')
+
+            path = os.path.join(tmpDir, 'columns')
+            statis.flatten(path)
+            self.assertEqual(len(os.listdir(path)), statis.columns, 'incorrect number of files')
+            table = np.loadtxt(os.path.join(path, '4-4_Volume'))
+            self.assertTrue(np.allclose(table, statis.data[:, [1, 21]]), 'incorrect column file')
+
+    def test_statis_write(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            path = os.path.join(tmpDir, 'STATIS')
+            self.statis.write(path)
+            with open(path) as inFile:
+                self.assertEqual(inFile.read(), self.text, 'STATIS changed on rewriting')
+
+    def test_statis_concat(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            # Restart after step 10 rewriting steps 10 and 15
+            first, second = os.path.join(tmpDir, 'STATIS.0'), os.path.join(tmpDir, 'STATIS.1')
+            with open(first, 'w') as outFile:
+                outFile.write(self.text[:self.text.index('        20')])
+            restart = dlp.statis.Statis('tests/STATIS', lastRows=3)
+            restart.data[:, 4] += 1.
+            restart.write(second)
+
+            merged = dlp.statis.Statis.concat([first, second])
+            self.assertTrue(np.array_equal(merged.step, self.statis.step), 'incorrect steps')
+            self.assertTrue(np.array_equal(merged.data[2:], restart.data), 'repeated steps not replaced')
+            self.assertTrue(np.array_equal(merged.data[:2], self.statis.data[:2]), 'incorrect first steps')
+
+            path = os.path.join(tmpDir, 'STATIS')
+            streamed = dlp.statis.Statis.concat([first, second], path, chunkRows=2)
+            self.assertTrue(np.array_equal(streamed.data, merged.data), 'incorrect merged file')
+            # Earlier segment last, so its records win
+            merged = dlp.statis.Statis.concat([second, first], path)
+            self.assertTrue(np.array_equal(merged.data[:4], self.statis.data[:4]), 'last writer not kept')
+            self.assertTrue(np.array_equal(merged.data[4], restart.data[2]), 'incorrect final step')
+
+            # Final record of the last segment still being written
+            with open(second, 'a') as outFile:
+                outFile.write(self.text[self.text.index('        15'):][:15])
+            merged = dlp.statis.Statis.concat([first, second], chunkRows=3)
+            self.assertTrue(np.array_equal(merged.data[2:], restart.data), 'partial record merged')
+
+            restart.data, restart.columns = restart.data[:, :-1], restart.columns - 1
+            restart.data[:, 2] = restart.columns
+            restart.write(second)
+            with self.assertRaises(ValueError):
+                dlp.statis.Statis.concat([first, second])
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(StatisTest('test_statis_shape'))
+    suite.addTest(StatisTest('test_statis_last_rows'))
+    suite.addTest(StatisTest('test_statis_chunks'))
+    suite.addTest(StatisTest('test_statis_chunk_partial'))
+    suite.addTest(StatisTest('test_statis_update'))
+    suite.addTest(StatisTest('test_statis_named_columns'))
+    suite.addTest(StatisTest('test_statis_export'))
+    suite.addTest(StatisTest('test_statis_write'))
+    suite.addTest(StatisTest('test_statis_concat'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+import dlpoly as dlp
+from dlpoly import timeseries
+
+
+class TimeSeriesTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(5)
+        # Independent values each held for 10 rows, so have a statistical inefficiency of 10
+        self.data = np.column_stack((rng.normal(size=20000), np.repeat(rng.normal(size=2000), 10)))
+
+    def test_timeseries_inefficiency(self):
+        inefficiency = timeseries.statistical_inefficiency(self.data)
+        self.assertTrue(np.allclose(inefficiency, (1., 10.), rtol=0.1), 'incorrect statistical inefficiency')
+        tau = timeseries.integrated_autocorrelation_time(self.data)
+        self.assertTrue(np.allclose(tau, (0.5, 5.), rtol=0.1), 'incorrect autocorrelation time')
+        self.assertAlmostEqual(timeseries.statistical_inefficiency(self.data[:, 1]), inefficiency[1],
+                               msg='single series differs')
+
+    def test_timeseries_blocking(self):
+        expected = self.data.std(axis=0) * np.sqrt((1., 10.) / np.array(20000.))
+        self.assertTrue(np.allclose(timeseries.blocking_error(self.data), expected, rtol=0.2),
+                        'incorrect blocking error')
+        blocks, error = timeseries.block_averages(self.data, 20)
+        self.assertEqual(blocks.shape, (20, 2), 'incorrect number of blocks')
+        self.assertTrue(np.allclose(blocks.mean(axis=0), self.data.mean(axis=0)), 'incorrect block means')
+        self.assertTrue(np.allclose(error, expected, rtol=0.5), 'incorrect block error')
+
+    def test_timeseries_equilibration(self):
+        data = self.data.copy()
+        data[:2000] += np.linspace(20., 0., 2000)[:, None]
+        start, inefficiency, _ = timeseries.detect_equilibration(data)
+        self.assertTrue(np.all((start >= 1500) & (start <= 4000)), 'incorrect equilibration')
+        start, *_ = timeseries.detect_equilibration(data, maxPoints=1000)
+        self.assertTrue(np.all((start >= 1500) & (start <= 4000)), 'incorrect blocked equilibration')
+        start, *_ = timeseries.detect_equilibration(np.ones((100, 2)))
+        self.assertTrue(np.all(start == 0), 'constant series not equilibrated')
+
+    def test_timeseries_statis(self):
+        statis = dlp.statis.Statis('tests/STATIS')
+        stats = timeseries.TimeSeries(statis, equilibrate=False)
+        self.assertEqual(len(stats.mean), statis.columns, 'incorrect number of columns')
+        self.assertAlmostEqual(stats['1-2 System Temperature']['mean'], statis.data[:, 4].mean(),
+                               msg='incorrect mean')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(TimeSeriesTest('test_timeseries_inefficiency'))
+    suite.addTest(TimeSeriesTest('test_timeseries_blocking'))
+    suite.addTest(TimeSeriesTest('test_timeseries_equilibration'))
+    suite.addTest(TimeSeriesTest('test_timeseries_statis'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+import dlpoly as dlp
+from dlpoly.pbc import wrap, to_fractional
+from dlpoly.topology import Topology
+
+
+class TopologyTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TopologyTest, cls).setUpClass()
+        cls.field = dlp.field.Field('tests/FIELD')
+        cls.topology = Topology(cls.field)
+
+    def setUp(self):
+        self.topology = TopologyTest.topology
+
+    def test_topology_field(self):
+        water = self.field.molecules['TIP3P water']
+        self.assertListEqual(water.siteNames, ['OW', 'HW', 'HW'], 'incorrect sites')
+        self.assertListEqual([pot.atoms for pot in water.get_pot_by_class('constraints')],
+                             [['1', '2'], ['1', '3'], ['2', '3']], 'incorrect constraints')
+        self.assertEqual(self.topology.natoms, 99120, 'incorrect number of atoms')
+        self.assertEqual(self.topology.nMolecules, 8 + 32096, 'incorrect number of molecules')
+        self.assertListEqual(self.topology.bonds[-3:].tolist(), [[99117, 99118], [99117, 99119], [99118, 99119]],
+                             'incorrect water bonds')
+
+    def test_topology_whole(self):
+        rng = np.random.default_rng(1)
+        cell = np.array([[60., 0., 0.], [10., 55., 0.], [5., 8., 50.]])
+        centres = rng.random((self.topology.nMolecules, 3)) @ cell
+        whole = centres[self.topology.molecule] + rng.normal(scale=0.5, size=(self.topology.natoms, 3))
+        result = self.topology.make_whole(wrap(whole, cell, 3), cell, 3)
+        shift = to_fractional(result - whole, cell)
+        self.assertTrue(np.allclose(shift, np.round(shift)), 'shifts not lattice vectors')
+        first, second = self.topology.bonds.T
+        self.assertTrue(np.allclose(shift[first], shift[second]), 'bonded atoms in different images')
+
+    def test_topology_arrays(self):
+        self.assertListEqual(self.topology.species[-3:].tolist(), ['OW', 'HW', 'HW'], 'incorrect species')
+        self.assertListEqual(self.topology.masses[-3:].tolist(), [16.0, 1.008, 1.008], 'incorrect masses')
+        self.assertTrue(np.allclose(self.topology.molecule_sum(self.topology.charges, axis=-1)[8:], 0.),
+                        'water molecules not neutral')
+        self.assertEqual(len(self.topology.starts), self.topology.nMolecules, 'incorrect molecule starts')
+
+    def test_topology_reductions(self):
+        rng = np.random.default_rng(2)
+        positions = rng.random((2, self.topology.natoms, 3)) * 10.
+        com = self.topology.centres_of_mass(positions)
+        dipoles = self.topology.dipoles(positions)
+        inertia = self.topology.inertia_tensors(positions)
+        self.assertEqual(com.shape, (2, self.topology.nMolecules, 3), 'incorrect shape')
+        for mol in (0, 7, 8, self.topology.nMolecules - 1):
+            atoms = self.topology.molecule == mol
+            masses, charges = self.topology.masses[atoms], self.topology.charges[atoms]
+            centre = masses @ positions[1, atoms] / masses.sum()
+            relative = positions[1, atoms] - centre
+            tensor = sum(mass * (rel @ rel * np.eye(3) - np.outer(rel, rel)) for mass, rel in zip(masses, relative))
+            self.assertTrue(np.allclose(com[1, mol], centre), 'incorrect centre of mass')
+            self.assertTrue(np.allclose(dipoles[1, mol], charges @ relative), 'incorrect dipole')
+            self.assertTrue(np.allclose(inertia[1, mol], tensor), 'incorrect inertia tensor')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(TopologyTest('test_topology_field'))
+    suite.addTest(TopologyTest('test_topology_whole'))
+    suite.addTest(TopologyTest('test_topology_arrays'))
+    suite.addTest(TopologyTest('test_topology_reductions'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
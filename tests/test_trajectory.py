@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import numpy as np
+from dlpoly.trajectory import convert_history, BinaryTrajectory
+from test_history import make_frames, write_history
+
+
+class TrajectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpDir.cleanup)
+        self.path = os.path.join(self.tmpDir.name, 'HISTORY')
+        self.frames = make_frames(7, 20)
+        write_history(self.path, self.frames)
+
+    def test_trajectory_convert(self):
+        store = os.path.join(self.tmpDir.name, 'store')
+        convert_history(self.path, store, dtype=np.float64, blockFrames=3)
+        traj = BinaryTrajectory(store)
+        self.assertEqual(len(traj), 7, 'incorrect number of frames')
+        self.assertEqual(traj.positions.shape, (7, 20, 3), 'incorrect shape')
+        self.assertTrue(np.allclose(traj.positions[4], self.frames[4].positions), 'incorrect positions')
+        self.assertTrue(np.allclose(traj[-1].forces, self.frames[-1].forces), 'incorrect forces')
+        self.assertTrue(np.allclose(traj.cells[2], self.frames[2].cell), 'incorrect cell')
+        self.assertListEqual(list(traj.elements[:2]), ['Na', 'Cl'], 'incorrect elements')
+
+    def test_trajectory_single(self):
+        store = os.path.join(self.tmpDir.name, 'store')
+        traj = convert_history(self.path, store)
+        self.assertEqual(traj.positions.dtype, np.float32, 'incorrect precision')
+        self.assertTrue(np.allclose(traj.positions[1], self.frames[1].positions, atol=1e-5),
+                        'incorrect positions')
+
+    def test_trajectory_reconvert(self):
+        store = os.path.join(self.tmpDir.name, 'store')
+        convert_history(self.path, store)
+        path = os.path.join(self.tmpDir.name, 'HISTORY.0')
+        frames = make_frames(3, 10, level=0)
+        write_history(path, frames, level=0)
+        traj = convert_history(path, store)
+        self.assertEqual((traj.level, len(traj)), (0, 3), 'incorrect level or number of frames')
+        self.assertIsNone(traj.velocities, 'velocities of earlier conversion kept')
+        self.assertFalse(os.path.isfile(os.path.join(store, 'forces.npy')), 'forces of earlier conversion kept')
+        self.assertTrue(np.allclose(traj.positions[2], frames[2].positions, atol=1e-5), 'incorrect positions')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(TrajectoryTest('test_trajectory_convert'))
+    suite.addTest(TrajectoryTest('test_trajectory_single'))
+    suite.addTest(TrajectoryTest('test_trajectory_reconvert'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
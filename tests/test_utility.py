@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import pickle
+import unittest
+from dlpoly.utility import DLPData, build_converter, schema_converters
+
+
+class Params(DLPData):
+    ''' DLPData with a schema of each kind of type '''
+    def __init__(self):
+        DLPData.__init__(self, {'steps': int, 'flag': bool, 'cut': float, 'name': str,
+                                'pair': (int, float), 'seed': (int, ...), 'tags': tuple})
+
+
+class UtilityTest(unittest.TestCase):
+
+    def test_utility_scalars(self):
+        params = Params()
+        params.steps = '10'
+        params.cut = ['8.5']
+        self.assertEqual((params.steps, params.cut), (10, 8.5), 'incorrect scalar cast')
+        params.flag = []
+        self.assertTrue(params.flag, 'present flag not true')
+        params.flag = 0
+        self.assertFalse(params.flag, 'explicitly false flag true')
+
+    def test_utility_sequences(self):
+        params = Params()
+        params.pair = ['1', '2.5']
+        self.assertEqual(params.pair, [1, 2.5], 'incorrect tuple cast')
+        params.seed = ['1', '2', '3']
+        self.assertEqual(params.seed, [1, 2, 3], 'incorrect ellided cast')
+        params.tags = ['a', 'b']
+        self.assertEqual(params.tags, ('a', 'b'), 'incorrect tuple')
+        with self.assertRaises(TypeError):
+            build_converter(int)([None])
+
+    def test_utility_shared_converters(self):
+        first, second = Params(), Params()
+        self.assertIs(first._converters, second._converters, 'converters not shared')
+        self.assertIs(schema_converters(dict(first.dataTypes)), first._converters, 'schema not cached')
+
+    def test_utility_pickle(self):
+        params = Params()
+        params.steps = 5
+        copy = pickle.loads(pickle.dumps(params))
+        copy.steps = '7'
+        self.assertEqual(copy.steps, 7, 'converters lost on unpickling')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(UtilityTest('test_utility_scalars'))
+    suite.addTest(UtilityTest('test_utility_sequences'))
+    suite.addTest(UtilityTest('test_utility_shared_converters'))
+    suite.addTest(UtilityTest('test_utility_pickle'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
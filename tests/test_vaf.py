@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from dlpoly.history import History
+from dlpoly.vaf import VAF
+from test_history import make_frames, write_history
+
+
+class VAFTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpDir.cleanup)
+        self.path = os.path.join(self.tmpDir.name, 'HISTORY')
+        rng = np.random.default_rng(5)
+        times = np.arange(200) * 0.01
+        phases = rng.random((6, 3)) * 2*np.pi
+        # Na oscillate at 5 THz, Cl at 12 THz
+        freqs = np.tile([5., 12.], 3)[:, None]
+        self.velocities = np.cos(2*np.pi*freqs*times[:, None, None] + phases)
+        frames = make_frames(len(times), 6)
+        for frame, time, velocities in zip(frames, times, self.velocities):
+            frame.time, frame.timestep, frame.velocities = time, 0.01, velocities
+        write_history(self.path, frames, level=1)
+
+    def test_vaf_correlation(self):
+        with mock.patch.object(History, 'read_frame', autospec=True, side_effect=History.read_frame) as read:
+            vaf = VAF(self.path, chunkAtoms=4)
+        self.assertEqual(read.call_count, len(self.velocities) + 1, 'HISTORY reparsed for each chunk')
+        nTimes = len(self.velocities)
+        na = self.velocities[:, ::2]
+        brute = [(na[lag:] * na[:nTimes-lag]).sum(axis=2).mean() for lag in range(nTimes)]
+        self.assertTrue(np.allclose(vaf['Na'], brute, atol=1e-6), 'incorrect VAF')
+
+    def test_vaf_dos(self):
+        vaf = VAF(self.path, groups=None)
+        self.assertListEqual(vaf.labels, ['all'], 'incorrect groups')
+        vaf = VAF(self.path)
+        frequencies, spectra = vaf.dos()
+        self.assertAlmostEqual(frequencies[np.argmax(spectra[vaf.labels.index('Na')])], 5., delta=0.3,
+                               msg='incorrect Na frequency')
+        self.assertAlmostEqual(frequencies[np.argmax(spectra[vaf.labels.index('Cl')])], 12., delta=0.3,
+                               msg='incorrect Cl frequency')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(VAFTest('test_vaf_correlation'))
+    suite.addTest(VAFTest('test_vaf_dos'))
+    return suite
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    runner.run(suite())